@@ -13,15 +13,23 @@ OHTC 專案管理儀表板 v2.0
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import hashlib
 import io
 import json
+from copy import copy
+from itertools import chain
+import pickle
+import re
+import zlib
 from openpyxl import load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
+from schedule_reader import EXCEL_READ_ENGINE  # calamine 優先，未安裝時為 None（openpyxl）
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -39,6 +47,74 @@ try:
 except ImportError:
     TEMPLATE_GENERATOR_AVAILABLE = False
 
+# 任務狀態類別（轉為 Categorical 後比較與分組皆以整數代碼進行）
+STATUS_CATEGORIES = ['Done', 'Going', 'Delay']
+
+# 甘特圖任務數超過此值時改用 WebGL（Scattergl）渲染；較少任務時保留 SVG 長條圖（hover 效果較佳）
+GANTT_WEBGL_THRESHOLD = 100
+
+# 任務名稱前的層級標記（■ / ├─ / └─ 及其縮排）
+TASK_LEVEL_PREFIX = re.compile(r'^\s*(?:■ |├─ |└─ )+')
+
+# 日期字串中的括號說明，例如 "2026/04/01(週三)" 的 "(週三)"
+DATE_NOTE_PATTERN = re.compile(r'\([^)]*\)')
+
+# 負責單位下拉選單的常用預設選項
+COMMON_OWNERS = ['TIM SMA', 'TIM Controls', 'TIM Mechanical', 'TIM Electrical', 'Vendor']
+
+# 新增任務的預設欄位（id、row_index 與計劃日期於新增時填入）
+NEW_TASK_TEMPLATE = {
+    'task': '新任務',
+    'is_parent': False,  # 預設為子項目
+    'level': 1,  # 預設為次項目
+    'owner': '',
+    'progress_pct': 0,
+    'target_pct': 0,
+    'remaining_days': 0,
+    'status': 'Going',
+    'plan_days': 7,
+    'actual_start': None,
+    'actual_end': None,
+    'actual_days': 0,
+    'variance_days': 0,
+    'coord_time': '',
+    'coord_manpower': '',
+    'coord_area': '',
+    'coord_equipment': '',
+    'notes': '',
+}
+
+# CSV 匯出預設欄位（未勾選「詳細欄位」時只輸出這些欄位，省略 row_index 等內部欄位）
+CSV_EXPORT_COLUMNS = [
+    'task', 'owner', 'status', 'progress_pct', 'plan_start', 'plan_end',
+    'actual_start', 'actual_end', 'variance_days', 'notes',
+]
+
+# 匯出 Excel 時寫回「軟體時程」的欄位：(欄號, 任務欄位, 預設值, 寫入方式)
+#   'keep_formula'：儲存格原本是公式時保留公式，不覆寫
+#   'date'：有日期時才寫入
+#   'value'：一律寫入
+EXPORT_TASK_COLUMNS = [
+    (1, 'task', '', 'keep_formula'),
+    (3, 'owner', '', 'keep_formula'),
+    (5, 'progress_pct', 0, 'keep_formula'),
+    (6, 'target_pct', 0, 'keep_formula'),
+    (7, 'remaining_days', 0, 'keep_formula'),
+    (8, 'status', '', 'value'),
+    (9, 'plan_start', None, 'date'),
+    (10, 'plan_end', None, 'date'),
+    (11, 'plan_days', 0, 'keep_formula'),
+    (12, 'actual_start', None, 'date'),
+    (13, 'actual_end', None, 'date'),
+    (14, 'actual_days', 0, 'keep_formula'),
+    (15, 'variance_days', 0, 'keep_formula'),
+    (16, 'coord_time', '', 'value'),
+    (17, 'coord_manpower', '', 'value'),
+    (18, 'coord_area', '', 'value'),
+    (19, 'coord_equipment', '', 'value'),
+    (20, 'notes', '', 'value'),
+]
+
 # ============================================================
 # 頁面設定
 # ============================================================
@@ -198,22 +274,32 @@ st.markdown("""
 # ============================================================
 # 資料載入與解析
 # ============================================================
-@st.cache_data
-def load_excel_data(uploaded_file):
-    """載入 Excel 檔案並解析各工作表"""
+@st.cache_data(max_entries=8, show_spinner="解析排程中...")
+def load_excel_data(file_bytes):
+    """載入 Excel 檔案並解析各工作表
+
+    以檔案內容（bytes）作為快取鍵；各工作表共用同一個 ExcelFile，只解壓與解析一次活頁簿。
+    最多保留 8 個檔案的解析結果，避免反覆上傳新版本時快取無限增長。
+    """
     try:
         from openpyxl import load_workbook
 
-        xl = pd.ExcelFile(uploaded_file)
+        xl = pd.ExcelFile(io.BytesIO(file_bytes), engine=EXCEL_READ_ENGINE)
         sheet_names = xl.sheet_names
 
-        # 使用 openpyxl 讀取格式資訊（背景色）
-        uploaded_file.seek(0)  # 重置檔案指標
-        wb = load_workbook(uploaded_file, data_only=False)
-        ws_software = wb['軟體時程']
-
         # 讀取軟體時程表
-        df_software = pd.read_excel(uploaded_file, sheet_name='軟體時程', header=None)
+        df_software = xl.parse('軟體時程', header=None)
+
+        # 讀取 A 欄背景色：calamine 不提供儲存格樣式，改以 openpyxl 唯讀模式串流 A 欄
+        # （openpyxl 引擎時直接使用 ExcelFile 內的唯讀活頁簿，不另外載入）
+        own_style_book = xl.engine != 'openpyxl'
+        style_book = load_workbook(io.BytesIO(file_bytes), read_only=True) if own_style_book else xl.book
+        fill_colors = [
+            row[0].fill.start_color if row and row[0].fill else None
+            for row in style_book['軟體時程'].iter_rows(max_col=1)
+        ]
+        if own_style_book:
+            style_book.close()
         
         # 提取專案資訊
         project_info = {
@@ -263,8 +349,7 @@ def load_excel_data(uploaded_file):
                     val_clean = str(val).strip()
 
                     # 移除括號及其內容（處理 "2026/04/01(週三)" 格式）
-                    import re
-                    val_clean = re.sub(r'\([^)]*\)', '', val_clean).strip()
+                    val_clean = DATE_NOTE_PATTERN.sub('', val_clean).strip()
 
                     # 如果清理後是空字串或只包含中文標題字樣，返回 None
                     if not val_clean or val_clean in ['計劃開始日期', '計劃完成日期', '實際開始日期', '實際完成日期']:
@@ -287,8 +372,10 @@ def load_excel_data(uploaded_file):
         # 解析任務資料
         tasks = []
         filtered_count = 0  # 記錄被過濾的任務數量
-        for i in range(6, len(df_software)):
-            row = df_software.iloc[i]
+        # 以 tuple 逐列讀取（values only），不為每列建立 Series
+        software_rows = list(df_software.itertuples(index=False, name=None))
+        for i in range(6, len(software_rows)):
+            row = software_rows[i]
             task_name = row[0]
 
             if pd.notna(task_name) and str(task_name).strip():
@@ -337,10 +424,9 @@ def load_excel_data(uploaded_file):
                 # 方法 3：使用 Excel 背景色
                 is_parent_by_color = False
                 try:
-                    excel_row = i + 1  # openpyxl 行索引從 1 開始
-                    cell_a = ws_software.cell(row=excel_row, column=1)
-                    if cell_a.fill and cell_a.fill.start_color:
-                        color = cell_a.fill.start_color.rgb
+                    start_color = fill_colors[i] if i < len(fill_colors) else None
+                    if start_color:
+                        color = start_color.rgb
                         if color and len(str(color)) >= 6:
                             color_str = str(color)[-6:]
                             try:
@@ -375,26 +461,34 @@ def load_excel_data(uploaded_file):
                     'is_parent': is_parent,  # 標記是否為大項目（主項目）
                     'level': level,  # 層級：0=主項目, 1=次項目, 2=次次項目
                     'owner': owner,
-                    'progress_pct': safe_float(row[4]),
-                    'target_pct': safe_float(row[5]),
-                    'remaining_days': safe_int(row[6]),
-                    'status': str(row[7]) if pd.notna(row[7]) else '',
-                    'plan_start': safe_datetime(row[8]),
-                    'plan_end': safe_datetime(row[9]),
-                    'plan_days': safe_int(row[10]),
-                    'actual_start': safe_datetime(row[11]),
-                    'actual_end': safe_datetime(row[12]),
-                    'actual_days': safe_int(row[13]),
-                    'variance_days': safe_int(row[14]),
-                    'coord_time': str(row[15]) if pd.notna(row[15]) else '',
-                    'coord_manpower': str(row[16]) if pd.notna(row[16]) else '',
-                    'coord_area': str(row[17]) if pd.notna(row[17]) else '',
-                    'coord_equipment': str(row[18]) if pd.notna(row[18]) else '',
-                    'notes': str(row[19]) if pd.notna(row[19]) else '',
                 }
                 tasks.append(task)
-        
-        df_tasks = pd.DataFrame(tasks)
+
+        # 數值、日期與文字欄位：對保留下來的列整欄一次轉換，不逐格呼叫 safe_*
+        if tasks:
+            body = df_software.iloc[[t['row_index'] for t in tasks]].reset_index(drop=True)
+            # 協調欄位多為少數固定值，以 Categorical 儲存；task、notes 等長文字沿用字串型別
+            # （pandas 3 搭配 pyarrow 時即為 Arrow 字串）
+            df_tasks = pd.DataFrame(tasks).assign(
+                progress_pct=numeric_column(body[4]),
+                target_pct=numeric_column(body[5]),
+                remaining_days=numeric_column(body[6], as_int=True),
+                status=text_column(body[7]),
+                plan_start=datetime_column(body[8]),
+                plan_end=datetime_column(body[9]),
+                plan_days=numeric_column(body[10], as_int=True),
+                actual_start=datetime_column(body[11]),
+                actual_end=datetime_column(body[12]),
+                actual_days=numeric_column(body[13], as_int=True),
+                variance_days=numeric_column(body[14], as_int=True),
+                coord_time=text_column(body[15]).astype('category'),
+                coord_manpower=text_column(body[16]).astype('category'),
+                coord_area=text_column(body[17]).astype('category'),
+                coord_equipment=text_column(body[18]).astype('category'),
+                notes=text_column(body[19]),
+            )
+        else:
+            df_tasks = pd.DataFrame()
 
         # 確保 progress_pct 為 0-100 格式
         if not df_tasks.empty and 'progress_pct' in df_tasks.columns:
@@ -424,7 +518,8 @@ def load_excel_data(uploaded_file):
                     except:
                         pass
                 return 'Going'
-            df_tasks['status'] = df_tasks.apply(calc_status, axis=1)
+            df_tasks['status'] = to_status_category(df_tasks.apply(calc_status, axis=1))
+            df_tasks['owner'] = to_owner_category(df_tasks['owner'])
 
         # 讀取系統時程（支援 系統時程_C, 系統時程_A, 系統時程 等名稱）
         system_sheet_name = None
@@ -434,7 +529,7 @@ def load_excel_data(uploaded_file):
                 break
 
         if system_sheet_name:
-            df_system = pd.read_excel(uploaded_file, sheet_name=system_sheet_name, header=None)
+            df_system = xl.parse(system_sheet_name, header=None)
         else:
             df_system = pd.DataFrame()
         system_items = []
@@ -450,8 +545,7 @@ def load_excel_data(uploaded_file):
                     hierarchy_col = idx
                     break
 
-        for i in range(5, len(df_system)):
-            row = df_system.iloc[i]
+        for row in df_system.iloc[5:].itertuples(index=False, name=None):
             item_name = str(row[0]).strip() if pd.notna(row[0]) else ''
 
             if item_name:
@@ -495,6 +589,12 @@ def load_excel_data(uploaded_file):
                 }
                 system_items.append(item)
         df_system_tasks = pd.DataFrame(system_items)
+        if not df_system_tasks.empty:
+            df_system_tasks['area'] = df_system_tasks['area'].astype('category')
+            df_system_tasks['item_type'] = df_system_tasks['item_type'].astype('category')
+            # 載入時統一欄位型別，編輯器不必在每次重跑時再轉換
+            df_system_tasks['completion_pct'] = pd.to_numeric(df_system_tasks['completion_pct'], errors='coerce')
+            df_system_tasks['target_date'] = pd.to_datetime(df_system_tasks['target_date'], errors='coerce')
         
         # 讀取進度統計（包含「工作進度」的工作表）
         df_engineering = pd.DataFrame()
@@ -508,7 +608,7 @@ def load_excel_data(uploaded_file):
                     break
 
             if eng_sheet_name:
-                df_eng_raw = pd.read_excel(uploaded_file, sheet_name=eng_sheet_name, header=None)
+                df_eng_raw = xl.parse(eng_sheet_name, header=None)
                 df_engineering = df_eng_raw
 
                 # 解析進度統計欄位
@@ -559,7 +659,7 @@ def load_excel_data(uploaded_file):
         
         # 讀取 EQ 工作清單
         try:
-            df_eq = pd.read_excel(uploaded_file, sheet_name='EQ 工作清單', header=None)
+            df_eq = xl.parse('EQ 工作清單', header=None)
         except:
             df_eq = pd.DataFrame()
 
@@ -567,12 +667,12 @@ def load_excel_data(uploaded_file):
         layout_images = []
         try:
             if 'Layout' in sheet_names:
+                # 唯讀模式不載入圖片，只有含 Layout 分頁時才完整載入活頁簿
+                wb = load_workbook(io.BytesIO(file_bytes))
                 ws_layout = wb['Layout']
                 if hasattr(ws_layout, '_images') and ws_layout._images:
                     for img in ws_layout._images:
                         try:
-                            # 提取圖片資訊
-                            import io
                             # 獲取圖片二進制資料
                             if hasattr(img, 'ref') and hasattr(img.ref, 'getvalue'):
                                 img_bytes = img.ref.getvalue()
@@ -596,7 +696,6 @@ def load_excel_data(uploaded_file):
             'engineering': df_engineering,
             'progress_stats': df_progress_stats,  # 進度統計
             'eq_list': df_eq,
-            'raw_software': df_software,
             'sheet_names': sheet_names,
             'layout_images': layout_images,
             'filtered_count': filtered_count,  # 被過濾的任務數量
@@ -606,6 +705,263 @@ def load_excel_data(uploaded_file):
         return None
 
 
+@st.cache_data(show_spinner=False)
+def preview_raw_sheet(file_bytes, nrows=10):
+    """讀取「軟體時程」前幾列原始資料（除錯檢視用，每個上傳檔只解析一次）
+
+    固定使用 openpyxl 引擎：pandas 以 read_only 模式串流工作表，讀到 nrows 列即停止；
+    calamine 則會先解析整張工作表，只取前幾列時反而較慢。
+    """
+    return pd.read_excel(io.BytesIO(file_bytes), sheet_name='軟體時程', header=None, nrows=nrows,
+                         engine='openpyxl')
+
+
+# ============================================================
+# 工具函數
+# ============================================================
+def numeric_column(s, as_int=False):
+    """整欄轉為數值，無法轉換或空白者為 0（as_int=True 時截斷為整數）"""
+    values = pd.to_numeric(s, errors='coerce').fillna(0)
+    return values.astype('int64') if as_int else values.astype('float64')
+
+
+def datetime_column(s):
+    """整欄轉為日期；字串先移除括號說明（如 "(週三)"），無法解析者為 NaT"""
+    def to_datetime(values, **kwargs):
+        try:
+            return pd.to_datetime(values, errors='coerce', **kwargs)
+        except (TypeError, ValueError, OverflowError):
+            # 部分 pandas 版本遇到 datetime.time 等儲存格型別時即使 coerce 仍會拋錯，
+            # 改為逐格轉換，只讓無法轉換的儲存格成為 NaT，不影響整份檔案載入
+            return pd.to_datetime(values.map(lambda v: safe_timestamp(v, **kwargs)), errors='coerce')
+
+    is_text = s.map(lambda v: isinstance(v, str)).astype(bool)
+    dates = to_datetime(s.mask(is_text))
+    if is_text.any():
+        cleaned = s[is_text].str.replace(DATE_NOTE_PATTERN, '', regex=True).str.strip()
+        dates[is_text] = to_datetime(cleaned, format='mixed')
+    return dates
+
+
+def safe_timestamp(value, **kwargs):
+    """單一儲存格轉為日期，無法轉換時回傳 NaT"""
+    try:
+        return pd.to_datetime(value, errors='coerce', **kwargs)
+    except (TypeError, ValueError, OverflowError):
+        return pd.NaT
+
+
+def text_column(s):
+    """整欄轉為字串，空值為空字串"""
+    return s.astype(object).where(s.notna(), '').astype(str)
+
+
+@st.cache_data(show_spinner=False)
+def layout_thumbnails(layout_images, max_size=1200):
+    """將 Layout 圖片縮成預覽圖，回傳（預覽圖 bytes 列表, 標題列表, 無法解碼的圖片編號）"""
+    from PIL import Image
+
+    thumbs, captions, failed = [], [], []
+    for idx, img_bytes in enumerate(layout_images):
+        try:
+            with Image.open(io.BytesIO(img_bytes)) as im:
+                im.thumbnail((max_size, max_size))
+                buffer = io.BytesIO()
+                im.save(buffer, format='PNG')
+            thumbs.append(buffer.getvalue())
+            captions.append(f"Layout 圖片 {idx + 1}")
+        except Exception:
+            failed.append(idx + 1)
+    return thumbs, captions, failed
+
+
+def truncate_series(s, max_chars):
+    """向量化截斷字串欄位，超過 max_chars 個字元時加上 '...'"""
+    s = s.astype(object).fillna('').astype(str)
+    head = s.str.slice(0, max_chars)
+    return head.where(s.str.len() <= max_chars, head + '...')
+
+
+def plan_dates_mask(df_tasks):
+    """回傳同時具有計劃開始與完成日期的布林陣列（datetime64 欄位直接以 np.isnat 判斷）"""
+    start = df_tasks['plan_start'].to_numpy()
+    end = df_tasks['plan_end'].to_numpy()
+    if start.dtype.kind == 'M' and end.dtype.kind == 'M':
+        return ~(np.isnat(start) | np.isnat(end))
+    # 編輯後欄位可能變為 object 型別，退回 pandas 判斷
+    return (df_tasks['plan_start'].notna() & df_tasks['plan_end'].notna()).to_numpy()
+
+
+def row_hashes_digest(obj):
+    """依列順序雜湊各列的向量化雜湊值（列順序改變或多列變更互相抵消時結果也不同）"""
+    row_hashes = pd.util.hash_pandas_object(obj, index=False).to_numpy()
+    return hashlib.blake2b(row_hashes.tobytes()).hexdigest()
+
+
+def tasks_fingerprint(df):
+    """以向量化雜湊計算任務表指紋（作為快取鍵，避免序列化整張表）"""
+    return (len(df), tuple(df.columns), row_hashes_digest(df))
+
+
+@st.cache_data(hash_funcs={pd.Series: row_hashes_digest})
+def owner_choices(owners):
+    """整理負責單位選項，回傳（現有單位, 現有單位＋常用單位）；負責單位未變更時直接使用快取"""
+    existing_owners = [str(x) for x in owners.dropna().unique() if str(x).strip()]
+    # 加入常用單位作為預設選項
+    return sorted(existing_owners), sorted(dict.fromkeys(chain(existing_owners, COMMON_OWNERS)))
+
+
+@st.cache_data(hash_funcs={pd.DataFrame: tasks_fingerprint})
+def filter_tasks(tasks_df, status_filter, owner_filter, parent_filter, search):
+    """依狀態、負責單位、主項目與關鍵字篩選任務（相同篩選條件重複使用快取結果）"""
+    filtered_tasks = tasks_df
+
+    # 篩選狀態
+    if status_filter:
+        filtered_tasks = filtered_tasks[filtered_tasks['status'].isin(status_filter)]
+
+    # 篩選負責單位
+    if owner_filter:
+        filtered_tasks = filtered_tasks[filtered_tasks['owner'].isin(owner_filter)]
+
+    # 篩選主項目
+    if parent_filter == '僅主項目':
+        filtered_tasks = filtered_tasks[filtered_tasks['is_parent'] == True]
+    elif parent_filter == '僅次項目':
+        filtered_tasks = filtered_tasks[filtered_tasks['is_parent'] == False]
+
+    # 搜尋任務關鍵字（以純文字比對：字串欄位由 Arrow 核心處理，且輸入 "(" 等符號不會被當成正規表示式）
+    if search:
+        filtered_tasks = filtered_tasks[
+            filtered_tasks['task'].str.contains(search, case=False, na=False, regex=False) |
+            filtered_tasks['notes'].str.contains(search, case=False, na=False, regex=False)
+        ]
+
+    return filtered_tasks
+
+
+def task_positions(df, task_ids):
+    """回傳任務 ID 對應的列位置
+
+    ID → 位置對照表（pd.Index 雜湊表）保存在 session_state，只有查詢結果
+    與實際 ID 不符（資料列已增刪）時才重建，一般修改只需 O(1) 查詢。
+    """
+    ids = df['id'].to_numpy()
+    task_ids = np.asarray(task_ids)
+    lookup = st.session_state.get('task_id_lookup')
+    if lookup is not None and len(lookup) == len(ids):
+        pos = lookup.get_indexer_for(task_ids)
+        if len(pos) == len(task_ids) and (pos >= 0).all() and (ids[pos] == task_ids).all():
+            return pos
+    lookup = pd.Index(ids)
+    st.session_state['task_id_lookup'] = lookup
+    pos = lookup.get_indexer_for(task_ids)
+    return pos[pos >= 0]
+
+
+def allocate_task_ids(tasks_df, count):
+    """配發新的任務 ID（從 session_state 的計數器往後遞增，既有任務的 ID 保持不變）"""
+    start = st.session_state.get('next_task_id', 1)
+    if not tasks_df.empty:
+        # 重置或載入新檔案後，計數器可能小於現有最大 ID
+        start = max(start, int(tasks_df['id'].max()) + 1)
+    st.session_state['next_task_id'] = start + count
+    return list(range(start, start + count))
+
+
+def append_task_rows(tasks_df, new_rows):
+    """將緩衝的多筆新任務一次附加到任務表（單次 concat，Categorical 欄位保留型別）"""
+    new_df = pd.DataFrame(new_rows)
+    for col, dtype in tasks_df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and col in new_df.columns:
+            # 補上新任務帶來的類別，避免 concat 後退化為 object 型別
+            # （新值都已在類別內時不重建原表欄位，省下一次整欄複製）
+            new_values = pd.Index(new_df[col].dropna().unique())
+            if not new_values.isin(dtype.categories).all():
+                dtype = pd.CategoricalDtype(dtype.categories.union(new_values, sort=False))
+                tasks_df = tasks_df.assign(**{col: tasks_df[col].astype(dtype)})
+            new_df[col] = new_df[col].astype(dtype)
+    return pd.concat([tasks_df, new_df], ignore_index=True)
+
+
+def snapshot_tasks(df):
+    """將任務表序列化為壓縮位元組，作為編輯歷史快照（比保留整份 DataFrame 副本省記憶體）"""
+    return zlib.compress(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def restore_tasks(snapshot):
+    """由編輯歷史快照還原任務表"""
+    return pickle.loads(zlib.decompress(snapshot))
+
+
+def to_status_category(s):
+    """將狀態欄位轉為 Categorical（保留 Excel 中非標準的狀態值）"""
+    extras = sorted(v for v in s.dropna().unique() if v not in STATUS_CATEGORIES)
+    return s.astype(pd.CategoricalDtype(STATUS_CATEGORIES + extras))
+
+
+def to_owner_category(s):
+    """將負責單位欄位轉為 Categorical（類別含常用單位，下拉選單選到的值都能直接寫入）"""
+    owners = s.dropna().astype(str)
+    return owners.reindex(s.index).astype(pd.CategoricalDtype(sorted(set(owners) | set(COMMON_OWNERS))))
+
+
+def validate_tasks(df):
+    """驗證編輯後的任務資料，回傳依行序排列的錯誤訊息
+
+    每項規則以整欄遮罩一次計算，只對不合格的列組訊息。
+    """
+    found = []  # (列位置, 規則順序, 訊息)
+    labels = df.index + 1
+
+    def blank(col):
+        s = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        return (s.isna() | s.astype(str).str.strip().eq('')).to_numpy()
+
+    def collect(mask, order, make_msg):
+        for pos in np.flatnonzero(mask):
+            found.append((pos, order, make_msg(pos)))
+
+    def start_after_end(start_col, end_col):
+        if start_col not in df.columns or end_col not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        start = pd.to_datetime(df[start_col], errors='coerce').to_numpy()
+        end = pd.to_datetime(df[end_col], errors='coerce').to_numpy()
+        # NaT 與任何日期比較皆為 False，缺日期的列不會被標記
+        return start > end
+
+    # 1. 必填欄位檢查
+    collect(blank('task'), 0, lambda i: f"第 {labels[i]} 行：任務名稱不能為空")
+    collect(blank('owner'), 1, lambda i: f"第 {labels[i]} 行：負責單位不能為空")
+    collect(blank('status'), 2, lambda i: f"第 {labels[i]} 行：狀態不能為空")
+
+    # 2. 日期邏輯檢查
+    collect(
+        start_after_end('plan_start', 'plan_end'), 3,
+        lambda i: f"第 {labels[i]} 行：計劃開始日期 ({df['plan_start'].iloc[i]}) 不能晚於計劃完成日期 ({df['plan_end'].iloc[i]})"
+    )
+    collect(
+        start_after_end('actual_start', 'actual_end'), 4,
+        lambda i: f"第 {labels[i]} 行：實際開始日期不能晚於實際完成日期"
+    )
+
+    # 3. 百分比範圍檢查
+    if 'progress_pct' in df.columns:
+        progress = pd.to_numeric(df['progress_pct'], errors='coerce')
+        values = progress.to_numpy()
+        collect(
+            (df['progress_pct'].notna() & progress.isna()).to_numpy(), 5,
+            lambda i: f"第 {labels[i]} 行：完成百分比格式錯誤"
+        )
+        collect(
+            ((progress < 0) | (progress > 100)).to_numpy(), 5,
+            lambda i: f"第 {labels[i]} 行：完成百分比必須在 0-100 之間（目前：{float(values[i])}）"
+        )
+
+    found.sort(key=lambda e: (e[0], e[1]))
+    return [msg for _, _, msg in found]
+
+
 # ============================================================
 # 圖表生成函數
 # ============================================================
@@ -619,7 +975,7 @@ def create_gantt_chart(df_tasks, show_actual=False, show_today_line=True, gantt_
         gantt_auto_range: 是否自動範圍
         enable_zoom: 是否啟用縮放和拖曳（建議手機端開啟，電腦端關閉）
     """
-    gantt_data = df_tasks[df_tasks['plan_start'].notna() & df_tasks['plan_end'].notna()].copy()
+    gantt_data = df_tasks.loc[plan_dates_mask(df_tasks)]
 
     if gantt_data.empty:
         return None
@@ -632,33 +988,38 @@ def create_gantt_chart(df_tasks, show_actual=False, show_today_line=True, gantt_
     }
 
     try:
-        # 準備資料給 px.timeline
-        gantt_data['Start'] = pd.to_datetime(gantt_data['plan_start'])
-        gantt_data['Finish'] = pd.to_datetime(gantt_data['plan_end'])
-        # 保留完整任務名稱用於 hover
-        gantt_data['TaskFull'] = gantt_data['task']
+        # 準備資料給 px.timeline（以 assign 產生新欄位，不先複製整個任務資料框）
         # 縮短任務名稱以適應屏幕（手機端更短）
         # 如果啟用縮放（通常是手機端），使用更短的名稱
         max_chars = 10 if enable_zoom else 20
-        gantt_data['Task'] = gantt_data['task'].apply(
-            lambda x: str(x)[:max_chars] + '...' if len(str(x)) > max_chars else str(x)
-        )
-        gantt_data['Status'] = gantt_data['status']
-
-        # 創建甘特圖
-        import plotly.express as px
-        fig = px.timeline(
-            gantt_data,
-            x_start='Start',
-            x_end='Finish',
-            y='Task',
-            color='Status',
-            color_discrete_map=color_map,
-            title='📅 專案甘特圖',
-            hover_data={'TaskFull': True, 'owner': True, 'Task': False},  # 在 hover 時顯示完整任務名稱
-            labels={'TaskFull': '任務名稱'}
+        gantt_data = gantt_data.assign(
+            Start=pd.to_datetime(gantt_data['plan_start']),
+            Finish=pd.to_datetime(gantt_data['plan_end']),
+            TaskFull=gantt_data['task'],  # 保留完整任務名稱用於 hover
+            Task=truncate_series(gantt_data['task'], max_chars),
+            Status=gantt_data['status'],
         )
 
+        # 創建甘特圖（任務數量多時改用 WebGL 渲染，避免 SVG 長條圖拖慢縮放/拖曳）
+        if len(gantt_data) > GANTT_WEBGL_THRESHOLD:
+            fig = create_webgl_timeline(gantt_data, color_map)
+        else:
+            fig = px.timeline(
+                gantt_data,
+                x_start='Start',
+                x_end='Finish',
+                y='Task',
+                color='Status',
+                color_discrete_map=color_map,
+                title='📅 專案甘特圖',
+                hover_data={'TaskFull': True, 'owner': True, 'Task': False},  # 在 hover 時顯示完整任務名稱
+                labels={'TaskFull': '任務名稱'}
+            )
+
+        # 實際時程（如果有）：所有任務合併成單一 trace 疊加在計劃長條上
+        if show_actual:
+            add_actual_trace(fig, gantt_data, webgl=len(gantt_data) > GANTT_WEBGL_THRESHOLD)
+
         # 反轉 Y 軸，使第一個任務在最上面
         fig.update_yaxes(autorange='reversed')
 
@@ -755,63 +1116,105 @@ def create_gantt_chart(df_tasks, show_actual=False, show_today_line=True, gantt_
             }
         return None
 
-    # 實際時程（如果有）
-    if show_actual:
-        actual_data = gantt_data[gantt_data['actual_start'].notna() & gantt_data['actual_end'].notna()]
-        for idx, row in actual_data.iterrows():
-            try:
-                actual_start = pd.to_datetime(row['actual_start'])
-                actual_end = pd.to_datetime(row['actual_end'])
-
-                fig.add_trace(go.Bar(
-                    name='實際',
-                    y=[row['task']],
-                    x=[(actual_end - actual_start).days],
-                    base=actual_start,
-                    orientation='h',
-                    marker_color='rgba(0,0,0,0.3)',
-                    marker_line_color='black',
-                    marker_line_width=2,
-                    opacity=0.5,
-                    showlegend=False,
-                ))
-            except Exception as e:
-                continue
 
-    # 設定版面配置
+def create_webgl_timeline(gantt_data, color_map):
+    """以 Scattergl 粗線段繪製甘特圖（Plotly 沒有 WebGL 版本的長條圖）
+
+    Args:
+        gantt_data: 已包含 Start/Finish/Task/TaskFull/Status 欄位的任務資料框
+        color_map: 狀態顏色對應
+    """
+    fig = go.Figure()
+
+    for status, group in gantt_data.groupby('Status', sort=False, observed=True):
+        n = len(group)
+        # 每個任務輸出 [開始, 結束, None] 三個點，以 None 斷開各線段
+        x = np.empty(n * 3, dtype=object)
+        x[0::3] = group['Start'].to_numpy()
+        x[1::3] = group['Finish'].to_numpy()
+        x[2::3] = None
+        y = np.repeat(group['Task'].to_numpy(dtype=object), 3)
+        y[2::3] = None
+        customdata = np.repeat(group[['TaskFull', 'owner']].to_numpy(dtype=object), 3, axis=0)
+
+        fig.add_trace(go.Scattergl(
+            x=x,
+            y=y,
+            mode='lines',
+            name=str(status),
+            line=dict(color=color_map.get(status, '#6c757d'), width=16),
+            customdata=customdata,
+            hovertemplate='任務名稱=%{customdata[0]}<br>owner=%{customdata[1]}<extra></extra>',
+        ))
+
+    # 維持 Excel 中的任務順序
     fig.update_layout(
         title='📅 專案甘特圖',
-        height=max(500, len(gantt_data) * 28),
-        xaxis_title='日期',
-        yaxis_title='',
-        barmode='overlay',
-        yaxis={'categoryorder': 'trace'},  # 改為 'trace' 以保持 Excel 中的順序（從上到下）
-        yaxis_autorange='reversed',  # 反轉 y 軸，使第一個任務在最上面
-        xaxis={'type': 'date'},
+        legend_title_text='Status',
+        yaxis=dict(categoryorder='array', categoryarray=gantt_data['Task'].unique()),
     )
+    return fig
 
-    # 加入今日線（使用 add_shape 而不是 add_vline，避免日期格式問題）
-    try:
-        today = pd.Timestamp.now()
-        fig.add_shape(
-            type="line",
-            x0=today, x1=today,
-            y0=0, y1=1,
-            yref="paper",
-            line=dict(color="red", width=2, dash="dash"),
-        )
-        fig.add_annotation(
-            x=today, y=1,
-            yref="paper",
-            text="今日",
-            showarrow=False,
-            yshift=10,
-            font=dict(color="red", size=12)
-        )
-    except Exception as e:
-        pass  # 如果加今日線失敗，就不加
 
-    return fig
+def add_actual_trace(fig, gantt_data, webgl=False):
+    """將實際開始/完成日期以單一 trace 疊加到甘特圖（取代逐列 add_trace）
+
+    Args:
+        fig: 甘特圖
+        gantt_data: 已包含 Task/TaskFull 欄位的任務資料框
+        webgl: 甘特圖是否為 Scattergl 版本
+    """
+    actual_start = pd.to_datetime(gantt_data['actual_start'], errors='coerce')
+    actual_end = pd.to_datetime(gantt_data['actual_end'], errors='coerce')
+    mask = (actual_start.notna() & actual_end.notna()).to_numpy()
+    if not mask.any():
+        return
+
+    start = actual_start.to_numpy()[mask]
+    end = actual_end.to_numpy()[mask]
+    task = gantt_data['Task'].to_numpy(dtype=object)[mask]
+    customdata = np.column_stack([
+        gantt_data['TaskFull'].to_numpy(dtype=object)[mask],
+        pd.DatetimeIndex(start).strftime('%Y-%m-%d'),
+        pd.DatetimeIndex(end).strftime('%Y-%m-%d'),
+    ])
+    hovertemplate = '<b>%{customdata[0]}</b><br>實際: %{customdata[1]} ~ %{customdata[2]}<extra></extra>'
+
+    if webgl:
+        n = len(task)
+        x = np.empty(n * 3, dtype=object)
+        x[0::3] = start
+        x[1::3] = end
+        x[2::3] = None
+        y = np.repeat(task, 3)
+        y[2::3] = None
+        fig.add_trace(go.Scattergl(
+            x=x,
+            y=y,
+            mode='lines',
+            name='實際',
+            line=dict(color='rgba(0,0,0,0.5)', width=6),
+            customdata=np.repeat(customdata, 3, axis=0),
+            hovertemplate=hovertemplate,
+            showlegend=False,
+        ))
+    else:
+        # 日期軸上的長條寬度以毫秒為單位（與 px.timeline 相同）
+        fig.add_trace(go.Bar(
+            name='實際',
+            y=task,
+            x=(end - start) / np.timedelta64(1, 'ms'),
+            base=start,
+            orientation='h',
+            marker_color='rgba(0,0,0,0.3)',
+            marker_line_color='black',
+            marker_line_width=2,
+            opacity=0.5,
+            width=0.4,
+            customdata=customdata,
+            hovertemplate=hovertemplate,
+            showlegend=False,
+        ))
 
 
 def create_status_pie(df_tasks):
@@ -820,6 +1223,7 @@ def create_status_pie(df_tasks):
         return None
 
     status_counts = df_tasks['status'].value_counts()
+    status_counts = status_counts[status_counts > 0]  # Categorical 會列出未出現的類別
 
     if status_counts.empty:
         return None
@@ -844,31 +1248,28 @@ def create_owner_workload(df_tasks):
     if df_tasks.empty:
         return None
 
-    owner_stats = df_tasks.groupby('owner').agg({
-        'task': 'count',
-        'status': lambda x: list(x)
-    }).reset_index()
+    # 一次交叉統計各負責單位 × 狀態的任務數
+    counts = pd.crosstab(df_tasks['owner'], df_tasks['status'])
+    counts['total'] = counts.sum(axis=1)
+    counts = counts.reindex(columns=['Done', 'Going', 'Delay', 'total'], fill_value=0)
+    counts = counts[(counts.index != '') & (counts['total'] > 0)].sort_values('total', kind='stable')
 
-    owner_stats['done'] = owner_stats['status'].apply(lambda x: x.count('Done'))
-    owner_stats['going'] = owner_stats['status'].apply(lambda x: x.count('Going'))
-    owner_stats['delay'] = owner_stats['status'].apply(lambda x: x.count('Delay'))
-    owner_stats = owner_stats[owner_stats['owner'] != ''].sort_values('task', ascending=True)
-
-    if owner_stats.empty:
+    if counts.empty:
         return None
 
+    owners = counts.index.astype(str)
     fig = go.Figure()
-    fig.add_trace(go.Bar(name='已完成', y=owner_stats['owner'], x=owner_stats['done'],
+    fig.add_trace(go.Bar(name='已完成', y=owners, x=counts['Done'],
                         orientation='h', marker_color='#28a745'))
-    fig.add_trace(go.Bar(name='進行中', y=owner_stats['owner'], x=owner_stats['going'],
+    fig.add_trace(go.Bar(name='進行中', y=owners, x=counts['Going'],
                         orientation='h', marker_color='#ffc107'))
-    fig.add_trace(go.Bar(name='延遲', y=owner_stats['owner'], x=owner_stats['delay'],
+    fig.add_trace(go.Bar(name='延遲', y=owners, x=counts['Delay'],
                         orientation='h', marker_color='#dc3545'))
 
     fig.update_layout(
         barmode='stack',
         title='👥 各負責單位工作量',
-        height=max(300, len(owner_stats) * 30),
+        height=max(300, len(counts) * 30),
         xaxis_title='任務數量',
     )
     return fig
@@ -882,17 +1283,14 @@ def create_progress_trend(df_tasks):
     # 根據計劃完成日期模擬進度
     dates = pd.date_range(start='2025-05-01', end='2025-09-30', freq='W')
 
-    progress_data = []
-    for date in dates:
-        done = len(df_tasks[(df_tasks['plan_end'].notna()) & (df_tasks['plan_end'] <= date)])
-        total = len(df_tasks)
-        progress_data.append({
-            'date': date,
-            'completed': done,
-            'completion_rate': done / total * 100 if total > 0 else 0
-        })
-
-    df_progress = pd.DataFrame(progress_data)
+    # 計劃完成日期排序一次，再以 searchsorted 取得每週的累計完成數
+    plan_ends = pd.DatetimeIndex(pd.to_datetime(df_tasks['plan_end'], errors='coerce').dropna()).sort_values()
+    completed = plan_ends.searchsorted(dates, side='right')
+    df_progress = pd.DataFrame({
+        'date': dates,
+        'completed': completed,
+        'completion_rate': completed / len(df_tasks) * 100,
+    })
 
     fig = make_subplots(specs=[[{"secondary_y": True}]])
 
@@ -917,21 +1315,19 @@ def create_progress_trend(df_tasks):
 
 def create_risk_matrix(df_tasks):
     """風險評估矩陣"""
-    delay_tasks = df_tasks[df_tasks['status'] == 'Delay'].copy()
+    delay_tasks = df_tasks.loc[df_tasks['status'] == 'Delay']
     
     if delay_tasks.empty:
         return None
     
-    # 計算風險等級（基於誤差天數）
-    def calc_risk(variance):
-        if pd.isna(variance) or variance == 0:
-            return 'low'
-        elif abs(variance) <= 7:
-            return 'medium'
-        else:
-            return 'high'
-    
-    delay_tasks['risk_level'] = delay_tasks['variance_days'].apply(calc_risk)
+    # 計算風險等級（基於誤差天數）：空值或 0 為 low，7 天內為 medium，其餘為 high
+    variance = pd.to_numeric(delay_tasks['variance_days'], errors='coerce').abs().to_numpy(dtype=float)
+    risk_level = np.select(
+        [np.isnan(variance) | (variance == 0), variance <= 7],
+        ['low', 'medium'],
+        default='high',
+    )
+    delay_tasks = delay_tasks.assign(risk_level=risk_level)
     
     risk_colors = {'high': '#dc3545', 'medium': '#ffc107', 'low': '#28a745'}
     
@@ -1006,7 +1402,7 @@ def create_owner_progress_chart(df_tasks):
     if df_tasks.empty:
         return None
 
-    owner_stats = df_tasks.groupby('owner').agg({
+    owner_stats = df_tasks.groupby('owner', observed=True).agg({
         'progress_pct': 'mean',
         'task': 'count'
     }).reset_index()
@@ -1049,7 +1445,7 @@ def create_owner_progress_chart(df_tasks):
 
 def create_area_progress(df_system):
     """區域進度圖"""
-    area_data = df_system[df_system['is_area'] == True].copy()
+    area_data = df_system[df_system['is_area']]
     
     if area_data.empty:
         return None
@@ -1076,6 +1472,61 @@ def create_area_progress(df_system):
     return fig
 
 
+def build_item_progress_html(items):
+    """為系統時程的主項目/次項目產生進度條 HTML（回傳加上 bar_html 欄位的副本）"""
+    pct = items['completion_pct'].fillna(0)
+    color = pd.Series(
+        np.select([pct >= 70, pct >= 30], ['#28a745', '#ffc107'], '#dc3545'),
+        index=items.index,
+    )
+    pct_text = pct.round().astype(int).astype(str) + '%'
+    width = pct.astype(str)
+    is_main = items['is_main']
+
+    main_html = (
+        '<div style="padding: 8px 0; margin: 8px 0 2px 0; border-left: 4px solid ' + color + '; padding-left: 12px;">'
+        '<div style="display: flex; align-items: center;">'
+        '<div style="font-weight: bold; font-size: 1.05em; min-width: 200px; flex-shrink: 0;">▶ ' + items['item'].str[:40] + '</div>'
+        '<div style="flex: 1; background: rgba(128,128,128,0.3); border-radius: 4px; height: 20px; margin: 0 10px; min-width: 100px;">'
+        '<div style="width: ' + width + '%; background: ' + color + '; height: 100%; border-radius: 4px;"></div>'
+        '</div>'
+        '<div style="width: 50px; text-align: right; font-weight: bold;">' + pct_text + '</div>'
+        '</div></div>'
+    )
+    # 次項目以 └ 標示，沒有主項目的項目以 • 標示
+    bullet = pd.Series(np.where(items['main_item'] == '', '• ', '└ '), index=items.index)
+    sub_html = (
+        '<div style="display: flex; align-items: center; margin: 2px 0; padding-left: 40px; opacity: 0.9;">'
+        '<div style="min-width: 180px; flex-shrink: 0; font-size: 0.95em;">' + bullet + items['item'].str[:35] + '</div>'
+        '<div style="flex: 1; background: rgba(128,128,128,0.2); border-radius: 4px; height: 14px; margin: 0 10px; min-width: 80px;">'
+        '<div style="width: ' + width + '%; background: ' + color + '; height: 100%; border-radius: 4px;"></div>'
+        '</div>'
+        '<div style="width: 50px; text-align: right; font-size: 0.9em;">' + pct_text + '</div>'
+        '</div>'
+    )
+    return items.assign(bar_html=main_html.where(is_main, sub_html))
+
+
+# 以下快取只套用在建構成本明顯高於快取讀取（雜湊＋反序列化）的圖表；
+# 甘特圖的今日線以當下時間計算，因此快取最多保留一小時
+@st.cache_data(hash_funcs={pd.DataFrame: tasks_fingerprint}, show_spinner=False, ttl=3600, max_entries=32)
+def cached_gantt_chart(df_tasks, show_actual, show_today_line, gantt_auto_range, enable_zoom):
+    """快取甘特圖（任務與顯示設定未變更時直接使用快取）"""
+    return create_gantt_chart(df_tasks, show_actual, show_today_line, gantt_auto_range, enable_zoom)
+
+
+@st.cache_data(hash_funcs={pd.DataFrame: tasks_fingerprint}, show_spinner=False, max_entries=32)
+def cached_owner_workload(df_tasks):
+    """快取負責單位工作量圖"""
+    return create_owner_workload(df_tasks)
+
+
+@st.cache_data(hash_funcs={pd.DataFrame: tasks_fingerprint}, show_spinner=False, max_entries=32)
+def cached_progress_trend(df_tasks):
+    """快取進度趨勢圖"""
+    return create_progress_trend(df_tasks)
+
+
 # ============================================================
 # 報表生成函數
 # ============================================================
@@ -1091,11 +1542,14 @@ def generate_weekly_report(data, report_date=None):
     week_start = report_date - timedelta(days=report_date.weekday())
     week_end = week_start + timedelta(days=6)
     
-    # 統計數據
+    # 統計數據（狀態計數與各狀態的列位置只計算一次）
+    status_counts = df_tasks['status'].value_counts()
+    status_groups = df_tasks.groupby('status', sort=False, observed=True).indices
     total = len(df_tasks)
-    done = len(df_tasks[df_tasks['status'] == 'Done'])
-    going = len(df_tasks[df_tasks['status'] == 'Going'])
-    delay = len(df_tasks[df_tasks['status'] == 'Delay'])
+    done = int(status_counts.get('Done', 0))
+    going = int(status_counts.get('Going', 0))
+    delay = int(status_counts.get('Delay', 0))
+    pct_base = total or 1  # 避免空任務表除以零
     
     # 本週完成的任務
     completed_this_week = df_tasks[
@@ -1128,11 +1582,11 @@ def generate_weekly_report(data, report_date=None):
 | 指標 | 數值 | 佔比 |
 |------|------|------|
 | 總任務數 | {total} | 100% |
-| 已完成 | {done} | {done/total*100:.1f}% |
-| 進行中 | {going} | {going/total*100:.1f}% |
-| 延遲中 | {delay} | {delay/total*100:.1f}% |
+| 已完成 | {done} | {done/pct_base*100:.1f}% |
+| 進行中 | {going} | {going/pct_base*100:.1f}% |
+| 延遲中 | {delay} | {delay/pct_base*100:.1f}% |
 
-**整體完成率：{done/total*100:.1f}%**
+**整體完成率：{done/pct_base*100:.1f}%**
 
 ---
 
@@ -1143,8 +1597,8 @@ def generate_weekly_report(data, report_date=None):
     if completed_this_week.empty:
         report += "本週無完成項目\n"
     else:
-        for _, task in completed_this_week.iterrows():
-            report += f"- {task['task']} ({task['owner']})\n"
+        for task in completed_this_week.itertuples(index=False):
+            report += f"- {task.task} ({task.owner})\n"
     
     report += f"""
 ---
@@ -1156,9 +1610,9 @@ def generate_weekly_report(data, report_date=None):
     if planned_next_week.empty:
         report += "下週無預計完成項目\n"
     else:
-        for _, task in planned_next_week.iterrows():
-            end_date = task['plan_end'].strftime('%m/%d') if pd.notna(task['plan_end']) else 'N/A'
-            report += f"- {task['task']} (預計 {end_date}, {task['owner']})\n"
+        for task in planned_next_week.itertuples(index=False):
+            end_date = task.plan_end.strftime('%m/%d') if pd.notna(task.plan_end) else 'N/A'
+            report += f"- {task.task} (預計 {end_date}, {task.owner})\n"
     
     report += f"""
 ---
@@ -1167,12 +1621,12 @@ def generate_weekly_report(data, report_date=None):
 
 """
     
-    delay_tasks = df_tasks[df_tasks['status'] == 'Delay']
+    delay_tasks = df_tasks.iloc[status_groups.get('Delay', [])]
     if delay_tasks.empty:
         report += "目前無延遲項目 ✅\n"
     else:
-        for _, task in delay_tasks.head(10).iterrows():
-            report += f"- **{task['task']}** - {task['owner']}\n"
+        for task in delay_tasks.head(10).itertuples(index=False):
+            report += f"- **{task.task}** - {task.owner}\n"
     
     report += """
 ---
@@ -1191,63 +1645,87 @@ def generate_weekly_report(data, report_date=None):
 def generate_status_summary(data):
     """生成狀態摘要"""
     df_tasks = data['tasks']
-    
+    status_counts = df_tasks['status'].value_counts()
+    status_groups = df_tasks.groupby('status', sort=False, observed=True).indices
+    going_tasks = df_tasks.iloc[status_groups.get('Going', [])]
+
     summary = {
         'total': len(df_tasks),
-        'done': len(df_tasks[df_tasks['status'] == 'Done']),
-        'going': len(df_tasks[df_tasks['status'] == 'Going']),
-        'delay': len(df_tasks[df_tasks['status'] == 'Delay']),
-        'delay_tasks': df_tasks[df_tasks['status'] == 'Delay'][['task', 'owner', 'plan_end', 'variance_days']].to_dict('records'),
-        'upcoming': df_tasks[
-            (df_tasks['status'] == 'Going') & 
-            (df_tasks['plan_end'].notna()) &
-            (df_tasks['plan_end'] <= datetime.now() + timedelta(days=7))
+        'done': int(status_counts.get('Done', 0)),
+        'going': int(status_counts.get('Going', 0)),
+        'delay': int(status_counts.get('Delay', 0)),
+        'delay_tasks': df_tasks.iloc[status_groups.get('Delay', [])][['task', 'owner', 'plan_end', 'variance_days']].to_dict('records'),
+        'upcoming': going_tasks[
+            (going_tasks['plan_end'].notna()) &
+            (going_tasks['plan_end'] <= datetime.now() + timedelta(days=7))
         ][['task', 'owner', 'plan_end']].to_dict('records'),
     }
     
     return summary
 
 
+@st.cache_data(hash_funcs={pd.DataFrame: tasks_fingerprint}, show_spinner=False)
+def cached_weekly_report(df_tasks, project_info, report_date):
+    """快取週報內容（只以任務表指紋、專案資訊與報告日期作為快取鍵）"""
+    return generate_weekly_report({'tasks': df_tasks, 'project_info': project_info}, report_date)
+
+
+@st.cache_data(hash_funcs={pd.DataFrame: tasks_fingerprint}, show_spinner=False, ttl=3600)
+def cached_status_summary(df_tasks):
+    """快取狀態摘要（「本週到期」以當下時間計算，因此快取最多保留一小時）"""
+    return generate_status_summary({'tasks': df_tasks})
+
+
+@st.cache_resource
+def get_notifier(teams_webhook, teams_enabled):
+    """依 Teams 設定取得共用的通知器（相同設定只建立一次）"""
+    config = NotificationConfig()
+    config.teams_enabled = teams_enabled
+    config.teams_webhook_url = teams_webhook
+    return ProjectNotifier(config)
+
+
 # ============================================================
 # Excel 匯出函數
 # ============================================================
 def export_updated_excel(data, original_file, updated_tasks):
     """匯出更新後的 Excel（完整保留格式、公式、樣式）"""
+    from zipfile import ZipFile
+
     output = io.BytesIO()
+
+    # 先讀 zip 目錄：來源檔沒有外部連結零件（xl/externalLinks/）時，不會有外部參照的公式或名稱，
+    # 後面整段外部連結清理（需走訪所有工作表的儲存格）可以略過
+    original_file.seek(0)
+    with ZipFile(original_file) as archive:
+        has_external_links = any(name.startswith('xl/externalLinks/') for name in archive.namelist())
     original_file.seek(0)
 
-    # 載入工作簿，保留公式
-    try:
-        wb = load_workbook(original_file, keep_links=False, data_only=False)
-    except:
-        wb = load_workbook(original_file, keep_links=False)
+    # 載入工作簿，保留公式（data_only=False 為預設值；讀取失敗直接交由呼叫端顯示錯誤，不再重讀一次）
+    wb = load_workbook(original_file, keep_links=False, data_only=False)
 
     ws = wb['軟體時程']
 
     # 移除外部連結（但保留內部公式）
-    if hasattr(wb, 'defined_names'):
-        names_to_remove = []
-        for name in wb.defined_names:
-            try:
-                if wb.defined_names[name].attr_text and '[' in str(wb.defined_names[name].attr_text):
-                    names_to_remove.append(name)
-            except:
-                continue
+    if has_external_links and hasattr(wb, 'defined_names'):
+        names_to_remove = [
+            name for name, defined_name in wb.defined_names.items()
+            if isinstance(defined_name.attr_text, str) and '[' in defined_name.attr_text
+        ]
         for name in names_to_remove:
-            try:
-                del wb.defined_names[name]
-            except:
-                continue
+            wb.defined_names.pop(name, None)
 
     if hasattr(wb, '_external_links'):
         wb._external_links = []
 
     # 只移除外部引用的公式，保留內部公式
-    for sheet in wb.worksheets:
-        for row in sheet.iter_rows():
-            for cell in row:
-                if cell.value and isinstance(cell.value, str):
-                    if cell.value.startswith('=') and '[' in cell.value and ']' in cell.value:
+    # 直接走訪工作表已存在的儲存格（iter_rows 會為整個矩形範圍補建空白儲存格），
+    # 並先以 data_type == 'f' 篩出公式儲存格，一般數值／文字儲存格不做字串檢查
+    if has_external_links:
+        for sheet in wb.worksheets:
+            for cell in sheet._cells.values():
+                if cell.data_type == 'f' and isinstance(cell.value, str):
+                    if '[' in cell.value and ']' in cell.value:
                         try:
                             cell.value = None
                         except:
@@ -1260,17 +1738,13 @@ def export_updated_excel(data, original_file, updated_tasks):
     ws.cell(row=5, column=3).value = project_info.get('project_lead', '')
 
     # 獲取範本行（第 7 行）的樣式，用於新增任務
+    # 直接取儲存格的樣式索引陣列（StyleArray），新增列共用活頁簿中既有的字型／填色／框線等樣式項目，
+    # 不必逐項複製樣式物件，也不會在儲存時重新比對去重
     template_row_idx = 7
-    template_row_styles = {}
-    for col in range(1, 21):
-        cell = ws.cell(row=template_row_idx, column=col)
-        template_row_styles[col] = {
-            'font': cell.font.copy() if cell.font else None,
-            'fill': cell.fill.copy() if cell.fill else None,
-            'border': cell.border.copy() if cell.border else None,
-            'alignment': cell.alignment.copy() if cell.alignment else None,
-            'number_format': cell.number_format,
-        }
+    template_row_styles = {
+        col: ws.cell(row=template_row_idx, column=col)._style
+        for col in range(1, 21)
+    }
 
     # 計算原始任務數量（假設從第 7 行開始）
     original_task_count = len(data.get('tasks', pd.DataFrame()))
@@ -1278,90 +1752,110 @@ def export_updated_excel(data, original_file, updated_tasks):
 
     # 如果任務數量減少，刪除多餘的行
     if new_task_count < original_task_count:
+        # 清空該行的內容，但保留格式（不用 delete_rows：它不會調整公式與合併儲存格）
+        # 只處理實際存在的儲存格，不為空白位置建立新的儲存格物件
+        existing_cells = ws._cells
         for row_idx in range(7 + new_task_count, 7 + original_task_count):
-            # 清空該行的內容，但保留格式
             for col in range(1, 21):
-                ws.cell(row=row_idx, column=col).value = None
+                cell = existing_cells.get((row_idx, col))
+                if cell is not None:
+                    cell.value = None
 
     # 更新或新增任務（只更新數值欄位，保留公式欄位）
-    for idx, task in updated_tasks.iterrows():
+    # 先依 EXPORT_TASK_COLUMNS 逐欄取出整欄數值，再組成每列的數值 tuple 一次寫入
+    # 日期欄位整欄一次轉換（無法解析的值視為空白），迴圈內不再逐格呼叫 pd.to_datetime
+    task_count = len(updated_tasks)
+    column_values = []
+    for _, key, default, mode in EXPORT_TASK_COLUMNS:
+        if key not in updated_tasks.columns:
+            column_values.append([pd.NaT if mode == 'date' else default] * task_count)
+        elif mode == 'date':
+            column_values.append(pd.to_datetime(updated_tasks[key], errors='coerce').tolist())
+        else:
+            column_values.append(updated_tasks[key].tolist())
+    row_values = zip(*column_values)
+    cell_at = ws.cell  # 迴圈內重複呼叫，先取出綁定方法
+
+    # 先走訪一次既有儲存格，記下任務區（第 7 行起）可能含公式欄位中的公式位置；
+    # 寫入時直接查表跳過，不必逐格讀取儲存格內容檢查
+    keep_formula_cols = {col for col, _, _, mode in EXPORT_TASK_COLUMNS if mode == 'keep_formula'}
+    formula_cells = {
+        (row_idx, col)
+        for (row_idx, col), cell in ws._cells.items()
+        if row_idx >= 7 and col in keep_formula_cols
+        and isinstance(cell.value, str) and cell.value.startswith('=')
+    }
+
+    for idx, values in zip(updated_tasks.index, row_values):
         row_num = idx + 7  # 從第 7 行開始
 
         # 如果是新增的任務（超過原始行數），複製範本樣式
         if idx >= original_task_count:
-            for col in range(1, 21):
-                cell = ws.cell(row=row_num, column=col)
-                style = template_row_styles.get(col, {})
-                if style.get('font'):
-                    cell.font = style['font']
-                if style.get('fill'):
-                    cell.fill = style['fill']
-                if style.get('border'):
-                    cell.border = style['border']
-                if style.get('alignment'):
-                    cell.alignment = style['alignment']
-                if style.get('number_format'):
-                    cell.number_format = style['number_format']
-
-        # 只更新非公式欄位（保留 Excel 中的公式）
-        # 欄位 1: 任務名稱
-        cell = ws.cell(row=row_num, column=1)
-        if not (cell.value and isinstance(cell.value, str) and cell.value.startswith('=')):
-            cell.value = task.get('task', '')
-
-        # 欄位 3: 負責單位
-        cell = ws.cell(row=row_num, column=3)
-        if not (cell.value and isinstance(cell.value, str) and cell.value.startswith('=')):
-            cell.value = task.get('owner', '')
-
-        # 欄位 5-7: 進度數值（可能有公式，檢查後再更新）
-        for col, key in [(5, 'progress_pct'), (6, 'target_pct'), (7, 'remaining_days')]:
-            cell = ws.cell(row=row_num, column=col)
-            if not (cell.value and isinstance(cell.value, str) and cell.value.startswith('=')):
-                cell.value = task.get(key, 0)
-
-        # 欄位 8: 狀態
-        ws.cell(row=row_num, column=8).value = task.get('status', '')
-
-        # 欄位 9-10: 計劃日期
-        if pd.notna(task.get('plan_start')):
-            ws.cell(row=row_num, column=9).value = pd.to_datetime(task['plan_start'])
-        if pd.notna(task.get('plan_end')):
-            ws.cell(row=row_num, column=10).value = pd.to_datetime(task['plan_end'])
-
-        # 欄位 11: 計劃天數（可能是公式）
-        cell = ws.cell(row=row_num, column=11)
-        if not (cell.value and isinstance(cell.value, str) and cell.value.startswith('=')):
-            cell.value = task.get('plan_days', 0)
-
-        # 欄位 12-13: 實際日期
-        if pd.notna(task.get('actual_start')):
-            ws.cell(row=row_num, column=12).value = pd.to_datetime(task['actual_start'])
-        if pd.notna(task.get('actual_end')):
-            ws.cell(row=row_num, column=13).value = pd.to_datetime(task['actual_end'])
-
-        # 欄位 14-15: 實際天數、誤差天數（可能是公式）
-        for col, key in [(14, 'actual_days'), (15, 'variance_days')]:
-            cell = ws.cell(row=row_num, column=col)
-            if not (cell.value and isinstance(cell.value, str) and cell.value.startswith('=')):
-                cell.value = task.get(key, 0)
-
-        # 欄位 16-20: 協調欄位和備註
-        ws.cell(row=row_num, column=16).value = task.get('coord_time', '')
-        ws.cell(row=row_num, column=17).value = task.get('coord_manpower', '')
-        ws.cell(row=row_num, column=18).value = task.get('coord_area', '')
-        ws.cell(row=row_num, column=19).value = task.get('coord_equipment', '')
-        ws.cell(row=row_num, column=20).value = task.get('notes', '')
+            for col, style in template_row_styles.items():
+                cell_at(row=row_num, column=col)._style = copy(style)
+
+        for (col, _, _, mode), value in zip(EXPORT_TASK_COLUMNS, values):
+            if mode == 'date':
+                if value is not pd.NaT:
+                    cell_at(row=row_num, column=col).value = value
+                continue
+            # 只更新非公式欄位（保留 Excel 中的公式）
+            if (row_num, col) in formula_cells:
+                continue
+            cell_at(row=row_num, column=col).value = value
 
     # 更新日期
     ws.cell(row=5, column=13).value = datetime.now()
 
     # 儲存
-    wb.save(output)
+    save_workbook_fast(wb, output)
     output.seek(0)
     return output
 
 
+@st.cache_data(hash_funcs={pd.DataFrame: tasks_fingerprint}, show_spinner=False, max_entries=4)
+def cached_excel_export(file_bytes, project_info, tasks_df, export_date):
+    """快取匯出的 Excel 位元組（來源檔、專案資訊與任務未變更時，重複生成直接使用快取）
+
+    export_date 只作為快取鍵：工作表的更新日期在匯出當下寫入，跨日後會重新生成。
+    """
+    data = {'project_info': project_info, 'tasks': tasks_df}
+    return export_updated_excel(data, io.BytesIO(file_bytes), tasks_df).getvalue()
+
+
+def save_workbook_fast(wb, output, compresslevel=1):
+    """以較低的 DEFLATE 壓縮等級儲存活頁簿（與 wb.save 相同流程，寫入較快、檔案大小相近）"""
+    from zipfile import ZipFile, ZIP_DEFLATED
+    from openpyxl.writer.excel import ExcelWriter
+
+    archive = ZipFile(output, 'w', ZIP_DEFLATED, allowZip64=True, compresslevel=compresslevel)
+    wb.properties.modified = datetime.now(timezone.utc).replace(tzinfo=None)
+    ExcelWriter(wb, archive).save()
+
+
+@st.cache_data(max_entries=16)
+def build_template_bytes(name, code, lead, start_date):
+    """生成新專案範本 Excel 的位元組內容（以基本型別參數作為快取鍵）"""
+    project_info = {
+        'name': name,
+        'project_code': code,
+        'lead': lead,
+        'start_date': start_date,
+    }
+
+    generator = ScheduleTemplateGenerator()
+    generator.create_software_schedule(project_info)
+    generator.create_system_schedule()
+    generator.create_engineering_progress()
+    generator.create_eq_list()
+    generator.create_location_map()
+    generator.create_fab_map()
+
+    excel_buffer = io.BytesIO()
+    save_workbook_fast(generator.wb, excel_buffer)
+    return excel_buffer.getvalue()
+
+
 def export_report_to_word_format(report_content):
     """將報表匯出為可複製格式"""
     return report_content
@@ -1406,6 +1900,461 @@ def generate_export_filename(original_filename, project_name):
     return new_filename
 
 
+# ============================================================
+# 任務編輯器
+# ============================================================
+@st.fragment
+def render_task_editor(data, df_system):
+    """專案與任務編輯分頁（以 fragment 執行：篩選、表格編輯只重跑此區塊，儲存等操作再觸發整頁重跑）"""
+    st.subheader("✏️ 專案與任務編輯器")
+
+    # 初始化編輯用的 session_state（只有編輯分頁會修改，其他分頁直接讀取原始資料）
+    # load_excel_data 由 st.cache_data 快取，每次呼叫都會回傳反序列化後的新物件，
+    # 因此可直接引用 DataFrame，不需再額外複製一份
+    if 'edited_project_info' not in st.session_state:
+        st.session_state['edited_project_info'] = data['project_info'].copy()
+    if 'edited_all_tasks' not in st.session_state:
+        st.session_state['edited_all_tasks'] = data['tasks']
+    if 'edited_system_tasks' not in st.session_state:
+        st.session_state['edited_system_tasks'] = data['system_tasks']
+
+    # 提示：篩選與操作說明
+    st.info("💡 **使用提示：** 篩選與搜尋本身不會觸發頁面刷新。但執行操作（如新增、批量修改、儲存變更）後會重新載入頁面，此時會回到甘特圖分頁（這是 Streamlit 的限制）。修改完成後請前往「匯出」分頁儲存變更。")
+
+    # 初始化編輯歷史（用於撤銷/重做）
+    if 'edit_history' not in st.session_state:
+        st.session_state['edit_history'] = []
+        st.session_state['history_index'] = -1
+
+    # 顯示編輯狀態
+    status_col1, status_col2, status_col3 = st.columns([2, 1, 1])
+    with status_col1:
+        if 'last_edit_time' in st.session_state:
+            st.info(f"💡 最後編輯時間：{st.session_state['last_edit_time']}｜所有分頁已同步更新")
+    with status_col2:
+        # 撤銷按鈕
+        can_undo = st.session_state['history_index'] > 0
+        if st.button("↶ 撤銷", disabled=not can_undo, use_container_width=True, help="返回上一步操作"):
+            if can_undo:
+                st.session_state['history_index'] -= 1
+                st.session_state['edited_all_tasks'] = restore_tasks(st.session_state['edit_history'][st.session_state['history_index']][1])
+                st.success("✅ 已撤銷上一步操作")
+                st.rerun()
+    with status_col3:
+        # 重做按鈕
+        can_redo = st.session_state['history_index'] < len(st.session_state['edit_history']) - 1
+        if st.button("↷ 重做", disabled=not can_redo, use_container_width=True, help="重做已撤銷的操作"):
+            if can_redo:
+                st.session_state['history_index'] += 1
+                st.session_state['edited_all_tasks'] = restore_tasks(st.session_state['edit_history'][st.session_state['history_index']][1])
+                st.success("✅ 已重做操作")
+                st.rerun()
+
+    # 專案資訊編輯
+    st.markdown("### 📌 專案資訊")
+    with st.expander("點擊編輯專案資訊", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            new_project_code = st.text_input("專案工令", value=st.session_state['edited_project_info'].get('project_code', ''))
+            new_project_name = st.text_input("專案名稱", value=st.session_state['edited_project_info'].get('project_name', ''))
+        with col2:
+            new_project_lead = st.text_input("專案負責人", value=st.session_state['edited_project_info'].get('project_lead', ''))
+            new_start_date = st.date_input("開始日期", value=pd.to_datetime(st.session_state['edited_project_info'].get('start_date')) if pd.notna(st.session_state['edited_project_info'].get('start_date')) else datetime.now())
+
+        if st.button("💾 更新專案資訊", key="update_project"):
+            st.session_state['edited_project_info']['project_code'] = new_project_code
+            st.session_state['edited_project_info']['project_name'] = new_project_name
+            st.session_state['edited_project_info']['project_lead'] = new_project_lead
+            st.session_state['edited_project_info']['start_date'] = new_start_date
+            st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            st.success("✅ 專案資訊已更新｜所有圖表已同步")
+            st.rerun()
+
+    st.divider()
+
+    # 任務編輯
+    st.markdown("### 📋 任務清單編輯")
+
+    # 篩選器
+    st.markdown("**🔍 篩選與搜尋：**")
+    filter_col1, filter_col2, filter_col3, filter_col4, filter_col5 = st.columns(5)
+    with filter_col1:
+        status_filter_edit = st.multiselect(
+            "篩選狀態",
+            options=['Done', 'Going', 'Delay'],
+            default=['Done', 'Going', 'Delay'],
+            key="status_filter_edit"
+        )
+    with filter_col2:
+        # 安全地獲取負責單位列表（移除 NaN 和空值；下拉選單另含常用單位）
+        owners_list, owner_options = owner_choices(st.session_state['edited_all_tasks']['owner'])
+        owner_filter_edit = st.multiselect("篩選負責單位", options=owners_list, key="owner_filter_edit")
+    with filter_col3:
+        # 主項目篩選
+        parent_filter_edit = st.selectbox(
+            "篩選主項目",
+            options=['全部', '僅主項目', '僅次項目'],
+            index=0,
+            key="parent_filter_edit"
+        )
+    with filter_col4:
+        search_edit = st.text_input("🔍 搜尋任務關鍵字", key="search_edit")
+    with filter_col5:
+        if st.button("🔄 清除篩選", use_container_width=True):
+            # 清除篩選條件（透過設定 key 的方式強制重設）
+            for key in ['status_filter_edit', 'owner_filter_edit', 'parent_filter_edit', 'search_edit']:
+                if key in st.session_state:
+                    del st.session_state[key]
+            st.rerun()
+
+    st.divider()
+
+    # ========== 先定義篩選條件和變數 ==========
+    # 套用篩選條件（以任務表指紋與篩選值作為快取鍵）
+    filtered_tasks = filter_tasks(
+        st.session_state['edited_all_tasks'],
+        status_filter_edit,
+        owner_filter_edit,
+        parent_filter_edit,
+        search_edit,
+    )
+
+    # ========== 操作按鈕與批量操作 ==========
+    st.markdown("**操作：**")
+    op_col1, op_col2, op_col3, op_col4, op_col5 = st.columns(5)
+
+    with op_col1:
+        if st.button("➕ 新增任務", type="primary", use_container_width=True):
+            now = pd.Timestamp.now()
+            new_task = {
+                **NEW_TASK_TEMPLATE,
+                'id': allocate_task_ids(st.session_state['edited_all_tasks'], 1)[0],
+                'row_index': len(st.session_state['edited_all_tasks']) + 6,
+                'plan_start': now,
+                'plan_end': now + pd.Timedelta(days=NEW_TASK_TEMPLATE['plan_days']),
+            }
+            st.session_state['edited_all_tasks'] = append_task_rows(
+                st.session_state['edited_all_tasks'], [new_task]
+            )
+            st.rerun()
+
+    # 批量操作區域
+    with op_col2:
+        with st.popover("📝 批量修改狀態", use_container_width=True):
+            batch_status = st.selectbox("選擇新狀態", ["Done", "Going", "Delay"], key="batch_status")
+            batch_task_ids = st.multiselect(
+                "選擇要修改的任務 ID",
+                options=filtered_tasks['id'].tolist(),
+                key="batch_status_ids"
+            )
+            if st.button("✅ 套用批量狀態修改", use_container_width=True):
+                if batch_task_ids:
+                    df_edit = st.session_state['edited_all_tasks']
+                    df_edit.iloc[task_positions(df_edit, batch_task_ids), df_edit.columns.get_loc('status')] = batch_status
+                    st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    st.success(f"✅ 已將 {len(batch_task_ids)} 個任務狀態改為 {batch_status}")
+                    st.rerun()
+                else:
+                    st.warning("⚠️ 請選擇至少一個任務")
+
+    with op_col3:
+        with st.popover("👥 批量修改負責單位", use_container_width=True):
+            batch_owner = st.selectbox("選擇新負責單位", owner_options, key="batch_owner")
+            batch_owner_ids = st.multiselect(
+                "選擇要修改的任務 ID",
+                options=filtered_tasks['id'].tolist(),
+                key="batch_owner_ids"
+            )
+            if st.button("✅ 套用批量負責單位修改", use_container_width=True):
+                if batch_owner_ids:
+                    df_edit = st.session_state['edited_all_tasks']
+                    if isinstance(df_edit['owner'].dtype, pd.CategoricalDtype) and batch_owner not in df_edit['owner'].cat.categories:
+                        df_edit['owner'] = df_edit['owner'].cat.add_categories([batch_owner])
+                    df_edit.iloc[task_positions(df_edit, batch_owner_ids), df_edit.columns.get_loc('owner')] = batch_owner
+                    st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    st.success(f"✅ 已將 {len(batch_owner_ids)} 個任務負責單位改為 {batch_owner}")
+                    st.rerun()
+                else:
+                    st.warning("⚠️ 請選擇至少一個任務")
+
+    with op_col4:
+        with st.popover("🗑️ 批量刪除", use_container_width=True):
+            batch_delete_ids = st.multiselect(
+                "選擇要刪除的任務 ID",
+                options=filtered_tasks['id'].tolist(),
+                key="batch_delete_ids"
+            )
+            st.warning(f"⚠️ 將刪除 {len(batch_delete_ids)} 個任務，此操作無法復原")
+            if st.button("🗑️ 確認批量刪除", type="secondary", use_container_width=True):
+                if batch_delete_ids:
+                    st.session_state['edited_all_tasks'] = st.session_state['edited_all_tasks'][
+                        ~st.session_state['edited_all_tasks']['id'].isin(batch_delete_ids)
+                    ].reset_index(drop=True)
+                    st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    st.success(f"✅ 已刪除 {len(batch_delete_ids)} 個任務")
+                    st.rerun()
+                else:
+                    st.warning("⚠️ 請選擇至少一個任務")
+
+    with op_col5:
+        with st.popover("📋 複製任務", use_container_width=True):
+            copy_task_id = st.selectbox(
+                "選擇要複製的任務 ID",
+                options=filtered_tasks['id'].tolist(),
+                key="copy_task_id"
+            )
+            copy_count = st.number_input("複製份數", min_value=1, max_value=10, value=1, key="copy_count")
+
+            if st.button("📋 確認複製", use_container_width=True):
+                if copy_task_id:
+                    # 找到要複製的任務
+                    copy_pos = task_positions(st.session_state['edited_all_tasks'], [copy_task_id])
+
+                    if len(copy_pos):
+                        # 先將所有副本收集到列表，最後只做一次 concat
+                        task_count = len(st.session_state['edited_all_tasks'])
+                        original_row = st.session_state['edited_all_tasks'].iloc[copy_pos[0]].to_dict()
+                        new_ids = allocate_task_ids(st.session_state['edited_all_tasks'], copy_count)
+                        new_rows = [
+                            {
+                                **original_row,
+                                'id': new_ids[i],
+                                'row_index': task_count + i + 6,
+                                'task': f"{original_row['task']} (副本{i+1})",
+                            }
+                            for i in range(copy_count)
+                        ]
+
+                        st.session_state['edited_all_tasks'] = append_task_rows(
+                            st.session_state['edited_all_tasks'], new_rows
+                        )
+
+                        st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        st.success(f"✅ 已複製 {copy_count} 個任務")
+                        st.rerun()
+                    else:
+                        st.error("❌ 找不到要複製的任務")
+
+    # 顯示選項
+    show_all = st.checkbox("顯示所有欄位", value=False)
+
+    # 顯示篩選結果數量
+    st.caption(f"📊 顯示 {len(filtered_tasks)} / {len(st.session_state['edited_all_tasks'])} 個任務")
+
+    # 檢查是否有篩選結果
+    if filtered_tasks.empty:
+        st.warning("⚠️ 沒有符合篩選條件的任務")
+        st.stop()
+
+    # 準備顯示用的資料（加入層級標記，與 Excel 一致）
+    # 根據層級格式化任務名稱（向量化產生層級前綴）
+    if 'level' in filtered_tasks.columns:
+        levels = pd.to_numeric(filtered_tasks['level'], errors='coerce').fillna(0).astype(int).to_numpy()
+    else:
+        levels = np.zeros(len(filtered_tasks), dtype=int)
+    level_prefix = np.select(
+        [levels == 0, levels == 1, levels == 2],
+        ['■ ', '  ├─ ', '    └─ '],  # 主項目、次項目、次次項目
+        default=np.char.add(np.char.multiply('  ', levels), '└─ ')  # 更深層級
+    )
+    task_display = (
+        pd.Series(level_prefix, index=filtered_tasks.index, dtype=object) + filtered_tasks['task'].astype(str)
+    )
+
+    # 可編輯的任務表格
+    if show_all:
+        # 顯示所有欄位
+        edit_columns = ['id', 'task_display', 'owner', 'status', 'plan_start', 'plan_end',
+                      'plan_days', 'actual_start', 'actual_end', 'progress_pct',
+                      'variance_days', 'notes']
+    else:
+        # 只顯示主要欄位
+        edit_columns = ['id', 'task_display', 'owner', 'status', 'plan_start', 'plan_end', 'notes']
+
+    # 可編輯的任務表格（欄位標題由 column_config 的 label 設定，不需另外改名複製一份；
+    # 先只取編輯器需要的欄位再插入顯示名稱，pandas 2.x 下也不會整份複製篩選結果）
+    editor_source = filtered_tasks[[col for col in edit_columns if col != 'task_display']]
+    editor_source.insert(edit_columns.index('task_display'), 'task_display', task_display)
+    edited_tasks_df = st.data_editor(
+        editor_source,
+        column_config={
+            "id": st.column_config.NumberColumn("ID", disabled=True, width="small"),
+            "task_display": st.column_config.TextColumn("任務名稱", width="large"),
+            "owner": st.column_config.SelectboxColumn("負責單位", options=owner_options, width="medium"),
+            "status": st.column_config.SelectboxColumn("狀態", options=["Done", "Going", "Delay"], width="small"),
+            "plan_start": st.column_config.DateColumn("計劃開始", format="YYYY-MM-DD"),
+            "plan_end": st.column_config.DateColumn("計劃完成", format="YYYY-MM-DD"),
+            "plan_days": st.column_config.NumberColumn("計劃天數", width="small", disabled=True),
+            "actual_start": st.column_config.DateColumn("實際開始", format="YYYY-MM-DD"),
+            "actual_end": st.column_config.DateColumn("實際完成", format="YYYY-MM-DD"),
+            "progress_pct": st.column_config.NumberColumn("完成%", min_value=0, max_value=100, format="%.0f%%", width="small"),
+            "variance_days": st.column_config.NumberColumn("誤差天數", width="small", disabled=True),
+            "notes": st.column_config.TextColumn("備註", width="large"),
+        },
+        num_rows="dynamic",  # 允許新增/刪除行
+        use_container_width=True,
+        hide_index=True,
+        key="task_editor"
+    )
+
+    # 儲存變更
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        save_clicked = st.button("💾 儲存所有變更", type="primary", use_container_width=True)
+        if save_clicked and tasks_fingerprint(edited_tasks_df) == tasks_fingerprint(editor_source):
+            # 表格未修改，略過清理、驗證與歷史記錄
+            st.toast("ℹ️ 表格沒有變更，無需儲存")
+        elif save_clicked:
+            # 清理任務名稱（移除層級標記）；以 assign/drop 產生新表，不需先整份複製編輯結果
+            cleaned_tasks_df = edited_tasks_df
+            if 'task_display' in cleaned_tasks_df.columns:
+                cleaned_tasks_df = cleaned_tasks_df.assign(task=(
+                    cleaned_tasks_df['task_display'].fillna('').astype(str)
+                    .str.replace(TASK_LEVEL_PREFIX, '', regex=True).str.strip()
+                )).drop(columns=['task_display'])
+
+            # ========== 資料驗證 ==========
+            validation_errors = validate_tasks(cleaned_tasks_df)
+
+            # 顯示驗證錯誤
+            if validation_errors:
+                st.error("❌ 資料驗證失敗，請修正以下錯誤：")
+                for error in validation_errors[:10]:  # 最多顯示 10 個錯誤
+                    st.error(f"• {error}")
+                if len(validation_errors) > 10:
+                    st.error(f"... 還有 {len(validation_errors) - 10} 個錯誤未顯示")
+            else:
+                # 驗證通過，儲存資料
+                # 儲存到歷史記錄（用於撤銷/重做）
+                # 歷史記錄以（指紋, 快照）保存，只比較指紋即可判斷是否有變更
+                current_hash = tasks_fingerprint(st.session_state['edited_all_tasks'])
+                if len(st.session_state['edit_history']) == 0 or current_hash != st.session_state['edit_history'][-1][0]:
+                    # 清除重做歷史
+                    st.session_state['edit_history'] = st.session_state['edit_history'][:st.session_state['history_index'] + 1]
+                    # 加入新歷史
+                    st.session_state['edit_history'].append((current_hash, snapshot_tasks(st.session_state['edited_all_tasks'])))
+                    st.session_state['history_index'] = len(st.session_state['edit_history']) - 1
+                    # 限制歷史記錄數量（最多 20 步）
+                    if len(st.session_state['edit_history']) > 20:
+                        st.session_state['edit_history'] = st.session_state['edit_history'][-20:]
+                        st.session_state['history_index'] = 19
+
+                # 更新 edited_all_tasks 的對應欄位（ID 欄位唯讀，保留原有 ID），以單次 assign 寫入
+                updated_tasks = st.session_state['edited_all_tasks'].assign(**{
+                    col: cleaned_tasks_df[col]
+                    for col in edit_columns
+                    if col != 'id' and col in cleaned_tasks_df.columns
+                })
+                # 編輯器回傳的負責單位可能已是一般字串，重新轉回 Categorical
+                updated_tasks['owner'] = to_owner_category(updated_tasks['owner'])
+                st.session_state['edited_all_tasks'] = updated_tasks
+
+                # 更新時間戳記
+                st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+                # 儲存當前狀態到歷史（內容未變更時不重複加入）
+                saved_hash = tasks_fingerprint(st.session_state['edited_all_tasks'])
+                if saved_hash != st.session_state['edit_history'][-1][0]:
+                    st.session_state['edit_history'].append((
+                        saved_hash,
+                        snapshot_tasks(st.session_state['edited_all_tasks'])
+                    ))
+                st.session_state['history_index'] = len(st.session_state['edit_history']) - 1
+
+                st.success(f"✅ 已儲存 {len(cleaned_tasks_df)} 個任務的變更｜所有圖表已同步")
+                st.info("💡 所有分頁的圖表已更新，前往「匯出」分頁下載 Excel")
+                st.rerun()
+
+    with col2:
+        if st.button("🔄 重置為原始資料", use_container_width=True):
+            st.session_state['edited_project_info'] = data['project_info'].copy()
+            st.session_state['edited_all_tasks'] = data['tasks']
+            st.session_state['edited_system_tasks'] = data['system_tasks']
+            if 'last_edit_time' in st.session_state:
+                del st.session_state['last_edit_time']
+            st.success("✅ 已重置為原始資料")
+            st.rerun()
+
+    with col3:
+        st.markdown("**提示：** 可直接在表格中編輯、新增或刪除行（點擊行號旁的 ✖️）")
+
+    st.divider()
+    st.divider()
+
+    # ========== 系統時程編輯 ==========
+    st.markdown("### 🏭 系統時程編輯")
+    st.info("💡 編輯各區域的完成百分比、目標日期等資訊")
+
+    # 系統時程編輯器
+    if not df_system.empty and 'edited_system_tasks' in st.session_state:
+        system_col1, system_col2 = st.columns([3, 1])
+
+        with system_col1:
+            # 只顯示區域（is_area == True）的項目
+            # is_area 在載入時即為 bool 欄位，直接作為遮罩；只讀取，不需複製
+            area_tasks = st.session_state['edited_system_tasks'][
+                st.session_state['edited_system_tasks']['is_area']
+            ]
+
+            if not area_tasks.empty:
+                # 可編輯的系統時程表格
+                system_edit_columns = ['item', 'completion_pct', 'target_date', 'hierarchy']
+                system_column_names = {
+                    'item': '項目', 'completion_pct': '完成百分比',
+                    'target_date': '目標日期', 'hierarchy': '階層'
+                }
+
+                # 準備編輯用的數據（型別已在載入時轉換，這裡只把未填的完成百分比顯示為 0）
+                area_tasks_for_edit = area_tasks[system_edit_columns].fillna({'completion_pct': 0.0})
+
+                edited_system_df = st.data_editor(
+                    area_tasks_for_edit.rename(columns=system_column_names),
+                    column_config={
+                        "區域": st.column_config.TextColumn("區域", disabled=True, width="medium"),
+                        "完成百分比": st.column_config.NumberColumn(
+                            "完成百分比",
+                            min_value=0,
+                            max_value=100,
+                            format="%.1f%%",
+                            width="small",
+                            help="輸入 0-100 之間的數值（例如：75 代表 75%）"
+                        ),
+                        "目標日期": st.column_config.DateColumn("目標日期", format="YYYY-MM-DD"),
+                        "備註": st.column_config.TextColumn("備註", width="large"),
+                    },
+                    use_container_width=True,
+                    hide_index=True,
+                    key="system_editor"
+                )
+
+                st.caption(f"📊 共有 {len(edited_system_df)} 個區域")
+
+        with system_col2:
+            st.markdown("**系統時程操作：**")
+
+            if st.button("💾 儲存系統時程", type="primary", use_container_width=True):
+                # 還原欄位名稱
+                reverse_system_names = {v: k for k, v in system_column_names.items()}
+                edited_system_copy = edited_system_df.rename(columns=reverse_system_names)
+
+                # 更新 session_state 中的系統時程資料（只更新區域項目）
+                area_indices = area_tasks.index
+                for col in system_edit_columns:
+                    if col in edited_system_copy.columns:
+                        st.session_state['edited_system_tasks'].loc[area_indices, col] = edited_system_copy[col].values
+
+                st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                st.success("✅ 系統時程已更新")
+                st.rerun()
+
+            if st.button("🔄 重置系統時程", use_container_width=True):
+                st.session_state['edited_system_tasks'] = data['system_tasks']
+                st.success("✅ 已重置為原始系統時程")
+                st.rerun()
+    else:
+        st.warning("⚠️ 未偵測到系統時程資料")
+
+
 # ============================================================
 # 主應用程式
 # ============================================================
@@ -1471,13 +2420,16 @@ def main():
 
         # Excel 原始資料檢視
         with st.expander("🔍 Excel 原始資料檢視（除錯用）", expanded=False):
-            try:
-                df_raw = pd.read_excel(uploaded_file, sheet_name='軟體時程', header=None, nrows=10)
-                st.write("**Excel 前 10 行原始資料：**")
-                st.dataframe(df_raw, use_container_width=True)
-                st.caption("請確認第 8 欄（I 欄，0-based 索引）和第 9 欄（J 欄）是否為計劃開始/完成日期")
-            except Exception as e:
-                st.error(f"無法讀取原始資料：{e}")
+            if uploaded_file is None:
+                st.caption("請先上傳 Excel 檔案")
+            else:
+                try:
+                    df_raw = preview_raw_sheet(uploaded_file.getvalue())
+                    st.write("**Excel 前 10 行原始資料：**")
+                    st.dataframe(df_raw, use_container_width=True)
+                    st.caption("請確認第 8 欄（I 欄，0-based 索引）和第 9 欄（J 欄）是否為計劃開始/完成日期")
+                except Exception as e:
+                    st.error(f"無法讀取原始資料：{e}")
 
         # 層級識別診斷（需要在上傳檔案後才顯示）
         if uploaded_file:
@@ -1493,7 +2445,7 @@ def main():
 
                 try:
                     # 嘗試載入資料以顯示診斷
-                    temp_data = load_excel_data(uploaded_file)
+                    temp_data = load_excel_data(uploaded_file.getvalue())
                     if temp_data and 'tasks' in temp_data:
                         temp_df = temp_data['tasks']
 
@@ -1501,17 +2453,21 @@ def main():
                         debug_data = []
                         level_names = {0: '主項目', 1: '次項目', 2: '次次項目'}
 
-                        for idx, row in temp_df.head(10).iterrows():
-                            level = row.get('level', 0)
+                        head_df = temp_df.head(10)
+                        task_short = truncate_series(head_df['task'], 30)
+                        owner_short = truncate_series(head_df['owner'], 10).replace('', '(無)')
+
+                        for row, task_name, owner_name in zip(head_df.itertuples(index=False), task_short, owner_short):
+                            level = getattr(row, 'level', 0)
                             level_display = level_names.get(level, f'層級{level+1}')
 
                             debug_data.append({
-                                'ID': row['id'],
-                                '任務名稱': row['task'][:30] + '...' if len(row['task']) > 30 else row['task'],
+                                'ID': row.id,
+                                '任務名稱': task_name,
                                 '層級': level_display,
-                                '視覺化': f"{'  ' * level}{'■' if level == 0 else '├─'} {row['task'][:20]}"[:35],
-                                '負責單位': (row['owner'][:10] + '...') if len(str(row['owner'])) > 10 else row['owner'] if row['owner'] else '(無)',
-                                '有日期': '✅' if pd.notna(row['plan_start']) and pd.notna(row['plan_end']) else '❌'
+                                '視覺化': f"{'  ' * level}{'■' if level == 0 else '├─'} {row.task[:20]}"[:35],
+                                '負責單位': owner_name,
+                                '有日期': '✅' if pd.notna(row.plan_start) and pd.notna(row.plan_end) else '❌'
                             })
                         st.dataframe(pd.DataFrame(debug_data), use_container_width=True)
 
@@ -1534,27 +2490,10 @@ def main():
 
                 if st.button("🔧 生成範本 Excel", type="primary", use_container_width=True):
                     try:
-                        project_info = {
-                            'name': new_proj_name,
-                            'project_code': new_proj_code,
-                            'lead': new_proj_lead,
-                            'start_date': new_proj_start,
-                        }
-
-                        generator = ScheduleTemplateGenerator()
-
-                        # 生成到 BytesIO 而非檔案
-                        generator.create_software_schedule(project_info)
-                        generator.create_system_schedule()
-                        generator.create_engineering_progress()
-                        generator.create_eq_list()
-                        generator.create_location_map()
-                        generator.create_fab_map()
-
-                        # 儲存到 BytesIO
-                        excel_buffer = io.BytesIO()
-                        generator.wb.save(excel_buffer)
-                        excel_buffer.seek(0)
+                        # 相同專案資訊重複生成時直接取用快取的範本
+                        excel_buffer = build_template_bytes(
+                            new_proj_name, new_proj_code, new_proj_lead, new_proj_start
+                        )
 
                         st.download_button(
                             label="⬇️ 下載新專案範本",
@@ -1616,23 +2555,24 @@ def main():
         return
     
     # 載入資料
-    data = load_excel_data(uploaded_file)
+    data = load_excel_data(uploaded_file.getvalue())
     if data is None:
         return
 
-    # 初始化 session_state（如果還沒有）
-    if 'edited_project_info' not in st.session_state:
-        st.session_state['edited_project_info'] = data['project_info'].copy()
-    if 'edited_all_tasks' not in st.session_state:
-        st.session_state['edited_all_tasks'] = data['tasks'].copy()
-    if 'edited_system_tasks' not in st.session_state:
-        st.session_state['edited_system_tasks'] = data['system_tasks'].copy()
-
     # 使用編輯後的資料（如果有），否則使用原始資料
     project_info = st.session_state.get('edited_project_info', data['project_info'])
     df_tasks = st.session_state.get('edited_all_tasks', data['tasks'])
     df_system = st.session_state.get('edited_system_tasks', data['system_tasks'])
     
+    # 各狀態任務數（一次 value_counts，專案資訊卡與關鍵指標卡共用）
+    status_counts = df_tasks['status'].value_counts()
+    total = len(df_tasks)
+    done = int(status_counts.get('Done', 0))
+    going = int(status_counts.get('Going', 0))
+    delay = int(status_counts.get('Delay', 0))
+    # 延遲任務子表（風險追蹤與延遲警報共用）
+    delay_df = df_tasks[df_tasks['status'] == 'Delay']
+
     # 專案資訊卡
     st.markdown("### 📌 專案資訊")
     cols = st.columns(5)
@@ -1646,51 +2586,33 @@ def main():
         if project_info['start_date']:
             st.metric("📅 開始日期", pd.to_datetime(project_info['start_date']).strftime('%Y-%m-%d'))
     with cols[4]:
-        total = len(df_tasks)
-        done = len(df_tasks[df_tasks['status'] == 'Done'])
         st.metric("📊 完成率", f"{done/total*100:.1f}%", f"{done}/{total}")
     
     st.divider()
     
-    # 關鍵指標卡
-    total = len(df_tasks)
-    done = len(df_tasks[df_tasks['status'] == 'Done'])
-    going = len(df_tasks[df_tasks['status'] == 'Going'])
-    delay = len(df_tasks[df_tasks['status'] == 'Delay'])
-    
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.markdown(f"""
-        <div style="background: linear-gradient(135deg, #28a745, #20c997); padding: 20px; border-radius: 10px; color: white; text-align: center;">
-            <div style="font-size: 2.5rem; font-weight: bold;">{done}</div>
-            <div>✅ 已完成</div>
-        </div>
-        """, unsafe_allow_html=True)
-    with col2:
-        st.markdown(f"""
-        <div style="background: linear-gradient(135deg, #ffc107, #fd7e14); padding: 20px; border-radius: 10px; color: white; text-align: center;">
-            <div style="font-size: 2.5rem; font-weight: bold;">{going}</div>
-            <div>🔄 進行中</div>
-        </div>
-        """, unsafe_allow_html=True)
-    with col3:
-        st.markdown(f"""
-        <div style="background: linear-gradient(135deg, #dc3545, #c82333); padding: 20px; border-radius: 10px; color: white; text-align: center;">
-            <div style="font-size: 2.5rem; font-weight: bold;">{delay}</div>
-            <div>⚠️ 延遲中</div>
-        </div>
-        """, unsafe_allow_html=True)
-    with col4:
-        st.markdown(f"""
-        <div style="background: linear-gradient(135deg, #6c757d, #495057); padding: 20px; border-radius: 10px; color: white; text-align: center;">
-            <div style="font-size: 2.5rem; font-weight: bold;">{total}</div>
-            <div>📝 總任務數</div>
-        </div>
-        """, unsafe_allow_html=True)
+    # 關鍵指標卡（四張卡片以 flex 排成一列，只輸出一次 markdown；窄螢幕時自動換行，與 st.columns 相同）
+    metric_cards = [
+        (done, '✅ 已完成', '#28a745, #20c997'),
+        (going, '🔄 進行中', '#ffc107, #fd7e14'),
+        (delay, '⚠️ 延遲中', '#dc3545, #c82333'),
+        (total, '📝 總任務數', '#6c757d, #495057'),
+    ]
+    st.markdown(
+        '<div style="display: flex; flex-wrap: wrap; gap: 1rem;">' + ''.join(
+            f'<div style="flex: 1 1 140px; background: linear-gradient(135deg, {colors}); padding: 20px; border-radius: 10px; color: white; text-align: center;">'
+            f'<div style="font-size: 2.5rem; font-weight: bold;">{value}</div>'
+            f'<div>{label}</div>'
+            '</div>'
+            for value, label, colors in metric_cards
+        ) + '</div>',
+        unsafe_allow_html=True,
+    )
     
     st.divider()
     
     # 主要標籤頁
+    # 切換分頁時重跑並追蹤目前分頁：純圖表分頁（1-5）只在開啟時建構內容；
+    # 編輯、週報、匯出分頁含輸入元件，照常執行以保留尚未儲存的編輯與設定
     tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
         "📅 甘特圖",
         "📊 統計分析",
@@ -1700,954 +2622,394 @@ def main():
         "✏️ 專案編輯",
         "📝 週報生成",
         "⬇️ 匯出"
-    ])
+    ], key='main_tab', on_change='rerun')
     
     # Tab 1: 甘特圖
     with tab1:
-        st.subheader("📅 專案甘特圖")
+        if tab1.open:
+            st.subheader("📅 專案甘特圖")
 
-        # 使用提示（根據縮放設定顯示不同訊息）
-        if enable_gantt_zoom:
-            st.info("✅ **手機模式已啟用：** 可用滾輪/雙指縮放、拖曳查看甘特圖。任務名稱已縮短以節省空間（最多10字），點擊任務條可查看完整資訊。")
-        else:
-            st.info("🔒 **電腦模式（縮放鎖定）：** 視圖固定，避免誤觸。任務名稱最多顯示20字。如需啟用手機模式，請至側邊欄「⚙️ 顯示設定」。")
-
-        # 診斷資訊
-        total_tasks = len(df_tasks)
-        tasks_with_dates = len(df_tasks[df_tasks['plan_start'].notna() & df_tasks['plan_end'].notna()])
-        filtered_count = data.get('filtered_count', 0)  # 獲取被過濾的任務數量
-
-        with st.expander("📊 資料診斷資訊", expanded=False):
-            st.write(f"**顯示任務數：** {total_tasks}")
-            st.write(f"**有計劃日期的任務：** {tasks_with_dates}")
-            st.write(f"**缺少日期的任務：** {total_tasks - tasks_with_dates}")
-
-            # 顯示過濾統計
-            if filtered_count > 0:
-                st.info(f"💡 **已自動過濾：** {filtered_count} 個任務（備註欄包含「不支援」）")
-                st.caption("💡 如果任務的 T 欄（備註欄）包含「不支援」，該任務將不會在系統中顯示。")
-
-            if tasks_with_dates == 0:
-                st.error("⚠️ 所有任務都缺少計劃日期！請檢查 Excel 中的 I 欄（計劃開始）和 J 欄（計劃完成）是否有填寫日期。")
-
-            # 顯示前 5 筆任務的日期狀態
-            st.write("**前 5 筆任務的日期狀態：**")
-            debug_df = df_tasks[['task', 'plan_start', 'plan_end', 'status']].head(5)
-            st.dataframe(debug_df)
-
-        gantt_fig = create_gantt_chart(df_tasks, show_actual, show_today_line, gantt_auto_range, enable_gantt_zoom)
-        if gantt_fig:
-            # 根據縮放設定配置 Plotly
-            plotly_config = {
-                'displayModeBar': True,  # 顯示工具列
-                'modeBarButtonsToRemove': ['lasso2d', 'select2d'],  # 移除不常用的工具
-                'displaylogo': False,  # 隱藏 Plotly logo
-                'responsive': True  # 響應式
-            }
-
-            # 只在啟用縮放時添加 scrollZoom
+            # 使用提示（根據縮放設定顯示不同訊息）
             if enable_gantt_zoom:
-                plotly_config['scrollZoom'] = True  # 啟用滾輪縮放
+                st.info("✅ **手機模式已啟用：** 可用滾輪/雙指縮放、拖曳查看甘特圖。任務名稱已縮短以節省空間（最多10字），點擊任務條可查看完整資訊。")
             else:
-                plotly_config['scrollZoom'] = False  # 禁用滾輪縮放
-                plotly_config['doubleClick'] = False  # 禁用雙擊重置
+                st.info("🔒 **電腦模式（縮放鎖定）：** 視圖固定，避免誤觸。任務名稱最多顯示20字。如需啟用手機模式，請至側邊欄「⚙️ 顯示設定」。")
+
+            # 診斷資訊
+            total_tasks = len(df_tasks)
+            tasks_with_dates = int(plan_dates_mask(df_tasks).sum())
+            filtered_count = data.get('filtered_count', 0)  # 獲取被過濾的任務數量
+
+            with st.expander("📊 資料診斷資訊", expanded=False):
+                st.write(f"**顯示任務數：** {total_tasks}")
+                st.write(f"**有計劃日期的任務：** {tasks_with_dates}")
+                st.write(f"**缺少日期的任務：** {total_tasks - tasks_with_dates}")
+
+                # 顯示過濾統計
+                if filtered_count > 0:
+                    st.info(f"💡 **已自動過濾：** {filtered_count} 個任務（備註欄包含「不支援」）")
+                    st.caption("💡 如果任務的 T 欄（備註欄）包含「不支援」，該任務將不會在系統中顯示。")
+
+                if tasks_with_dates == 0:
+                    st.error("⚠️ 所有任務都缺少計劃日期！請檢查 Excel 中的 I 欄（計劃開始）和 J 欄（計劃完成）是否有填寫日期。")
+
+                # 顯示前 5 筆任務的日期狀態
+                st.write("**前 5 筆任務的日期狀態：**")
+                debug_df = df_tasks[['task', 'plan_start', 'plan_end', 'status']].head(5)
+                st.dataframe(debug_df)
+
+            # 電腦模式（縮放鎖定）且自動範圍時無法拖曳查看畫面外的列，
+            # 只保留主項目與次項目，省去次次項目的圖表建構成本
+            df_gantt = df_tasks
+            if not enable_gantt_zoom and gantt_auto_range and 'level' in df_tasks.columns:
+                df_gantt = df_tasks[df_tasks['level'] <= 1]
+            hidden_gantt_count = len(df_tasks) - len(df_gantt)
+
+            gantt_fig = cached_gantt_chart(df_gantt, show_actual, show_today_line, gantt_auto_range, enable_gantt_zoom)
+            if gantt_fig:
+                # 根據縮放設定配置 Plotly
+                plotly_config = {
+                    'displayModeBar': True,  # 顯示工具列
+                    'modeBarButtonsToRemove': ['lasso2d', 'select2d'],  # 移除不常用的工具
+                    'displaylogo': False,  # 隱藏 Plotly logo
+                    'responsive': True  # 響應式
+                }
 
-            st.plotly_chart(
-                gantt_fig,
-                use_container_width=True,
-                config=plotly_config
-            )
-        else:
-            st.warning("⚠️ 資料不足，無法生成甘特圖")
-            st.info("💡 甘特圖需要任務包含「計劃開始日期」和「計劃完成日期」。請檢查 Excel 的 I 欄和 J 欄是否有填寫日期。")
-
-            # 顯示錯誤詳情
-            if 'gantt_chart_error_info' in st.session_state:
-                error_info = st.session_state['gantt_chart_error_info']
-                st.error(f"""
-                **甘特圖生成失敗詳情：**
-                - 有日期的任務數：{error_info['total']}
-                - 成功處理：{error_info['success']}
-                - 處理失敗：{error_info['error']}
-                """)
-                if error_info['messages']:
-                    st.write("**前 3 個錯誤範例：**")
-                    for msg in error_info['messages']:
-                        st.write(f"- {msg}")
-                # 清除錯誤訊息
-                del st.session_state['gantt_chart_error_info']
+                # 只在啟用縮放時添加 scrollZoom
+                if enable_gantt_zoom:
+                    plotly_config['scrollZoom'] = True  # 啟用滾輪縮放
+                else:
+                    plotly_config['scrollZoom'] = False  # 禁用滾輪縮放
+                    plotly_config['doubleClick'] = False  # 禁用雙擊重置
+
+                st.plotly_chart(
+                    gantt_fig,
+                    use_container_width=True,
+                    config=plotly_config
+                )
+                if hidden_gantt_count > 0:
+                    st.caption(f"💡 電腦模式已隱藏 {hidden_gantt_count} 個次次項目，啟用縮放或取消「甘特圖自動範圍」可查看全部任務")
+            else:
+                st.warning("⚠️ 資料不足，無法生成甘特圖")
+                st.info("💡 甘特圖需要任務包含「計劃開始日期」和「計劃完成日期」。請檢查 Excel 的 I 欄和 J 欄是否有填寫日期。")
+
+                # 顯示錯誤詳情
+                if 'gantt_chart_error_info' in st.session_state:
+                    error_info = st.session_state['gantt_chart_error_info']
+                    st.error(f"""
+                    **甘特圖生成失敗詳情：**
+                    - 有日期的任務數：{error_info['total']}
+                    - 成功處理：{error_info['success']}
+                    - 處理失敗：{error_info['error']}
+                    """)
+                    if error_info['messages']:
+                        st.write("**前 3 個錯誤範例：**")
+                        for msg in error_info['messages']:
+                            st.write(f"- {msg}")
+                    # 清除錯誤訊息
+                    del st.session_state['gantt_chart_error_info']
     
     # Tab 2: 統計分析
     with tab2:
-        # 子分頁
-        sub_tab1, sub_tab2, sub_tab3 = st.tabs(["📊 任務狀態分布", "📈 進度趨勢圖", "👤 負責人分析"])
-
-        with sub_tab1:
-            col1, col2 = st.columns(2)
-            with col1:
-                status_fig = create_status_pie(df_tasks)
-                if status_fig:
-                    st.plotly_chart(status_fig, use_container_width=True)
-                else:
-                    st.warning("資料不足，無法生成狀態圓餅圖")
-            with col2:
-                owner_fig = create_owner_workload(df_tasks)
-                if owner_fig:
-                    st.plotly_chart(owner_fig, use_container_width=True)
-                else:
-                    st.warning("資料不足，無法生成負責單位工作量圖")
+        if tab2.open:
+            # 子分頁
+            sub_tab1, sub_tab2, sub_tab3 = st.tabs(["📊 任務狀態分布", "📈 進度趨勢圖", "👤 負責人分析"])
+
+            with sub_tab1:
+                col1, col2 = st.columns(2)
+                with col1:
+                    status_fig = create_status_pie(df_tasks)
+                    if status_fig:
+                        st.plotly_chart(status_fig, use_container_width=True)
+                    else:
+                        st.warning("資料不足，無法生成狀態圓餅圖")
+                with col2:
+                    owner_fig = cached_owner_workload(df_tasks)
+                    if owner_fig:
+                        st.plotly_chart(owner_fig, use_container_width=True)
+                    else:
+                        st.warning("資料不足，無法生成負責單位工作量圖")
 
-            st.divider()
-            dist_fig = create_progress_distribution(df_tasks)
-            if dist_fig:
-                st.plotly_chart(dist_fig, use_container_width=True)
-
-        with sub_tab2:
-            trend_fig = create_progress_trend(df_tasks)
-            if trend_fig:
-                st.plotly_chart(trend_fig, use_container_width=True)
-            else:
-                st.warning("資料不足，無法生成進度趨勢圖")
+                st.divider()
+                dist_fig = create_progress_distribution(df_tasks)
+                if dist_fig:
+                    st.plotly_chart(dist_fig, use_container_width=True)
 
-        with sub_tab3:
-            owner_progress_fig = create_owner_progress_chart(df_tasks)
-            if owner_progress_fig:
-                st.plotly_chart(owner_progress_fig, use_container_width=True)
-            else:
-                st.warning("資料不足，無法生成負責人進度圖")
+            with sub_tab2:
+                trend_fig = cached_progress_trend(df_tasks)
+                if trend_fig:
+                    st.plotly_chart(trend_fig, use_container_width=True)
+                else:
+                    st.warning("資料不足，無法生成進度趨勢圖")
 
-            st.divider()
-            if not df_tasks.empty:
-                st.markdown("### 📋 負責人任務統計")
-                owner_summary = df_tasks.groupby('owner').agg({
-                    'task': 'count',
-                    'progress_pct': 'mean',
-                    'status': lambda x: (x == 'Done').sum()
-                }).reset_index()
-                owner_summary.columns = ['負責單位', '任務數', '平均進度(%)', '已完成']
-                owner_summary['完成率(%)'] = (owner_summary['已完成'] / owner_summary['任務數'] * 100).round(1)
-                owner_summary['平均進度(%)'] = owner_summary['平均進度(%)'].round(1)
-                owner_summary = owner_summary[owner_summary['負責單位'] != ''].sort_values('任務數', ascending=False)
-                st.dataframe(owner_summary, use_container_width=True, hide_index=True)
+            with sub_tab3:
+                owner_progress_fig = create_owner_progress_chart(df_tasks)
+                if owner_progress_fig:
+                    st.plotly_chart(owner_progress_fig, use_container_width=True)
+                else:
+                    st.warning("資料不足，無法生成負責人進度圖")
+
+                st.divider()
+                if not df_tasks.empty:
+                    st.markdown("### 📋 負責人任務統計")
+                    owner_summary = df_tasks.groupby('owner', observed=True).agg({
+                        'task': 'count',
+                        'progress_pct': 'mean',
+                        'status': lambda x: (x == 'Done').sum()
+                    }).reset_index()
+                    owner_summary.columns = ['負責單位', '任務數', '平均進度(%)', '已完成']
+                    owner_summary['完成率(%)'] = (owner_summary['已完成'] / owner_summary['任務數'] * 100).round(1)
+                    owner_summary['平均進度(%)'] = owner_summary['平均進度(%)'].round(1)
+                    owner_summary = owner_summary[owner_summary['負責單位'] != ''].sort_values('任務數', ascending=False)
+                    st.dataframe(owner_summary, use_container_width=True, hide_index=True)
     
     # Tab 3: 風險追蹤
     with tab3:
-        st.subheader("⚠️ 風險評估與追蹤")
-        
-        delay_df = df_tasks[df_tasks['status'] == 'Delay']
+        if tab3.open:
+            st.subheader("⚠️ 風險評估與追蹤")
         
-        if delay_df.empty:
-            st.success("🎉 太棒了！目前沒有延遲項目！")
-        else:
-            st.error(f"⚠️ 共有 {len(delay_df)} 個延遲項目需要關注")
+            if delay_df.empty:
+                st.success("🎉 太棒了！目前沒有延遲項目！")
+            else:
+                st.error(f"⚠️ 共有 {len(delay_df)} 個延遲項目需要關注")
             
-            col1, col2 = st.columns([2, 1])
+                col1, col2 = st.columns([2, 1])
             
-            with col1:
-                risk_fig = create_risk_matrix(df_tasks)
-                if risk_fig:
-                    st.plotly_chart(risk_fig, use_container_width=True)
+                with col1:
+                    risk_fig = create_risk_matrix(delay_df)
+                    if risk_fig:
+                        st.plotly_chart(risk_fig, use_container_width=True)
             
-            with col2:
-                st.markdown("### 🔴 高風險項目")
-                high_risk = delay_df[delay_df['variance_days'].abs() > 7]
-                for _, task in high_risk.iterrows():
-                    with st.expander(f"🔴 {task['task'][:30]}..."):
+                with col2:
+                    st.markdown("### 🔴 高風險項目")
+                    high_risk = delay_df[delay_df['variance_days'].abs() > 7]
+                    if high_risk.empty:
+                        st.caption("沒有誤差超過 7 天的延遲項目")
+                    else:
+                        # 以單一表格列出高風險項目，再由下拉選單查看單筆詳情
+                        high_risk_labels = truncate_series(high_risk['task'], 30).tolist()
+                        st.dataframe(
+                            high_risk[['task', 'owner', 'variance_days']].assign(task=high_risk_labels).rename(columns={
+                                'task': '任務', 'owner': '負責單位', 'variance_days': '誤差天數'
+                            }),
+                            use_container_width=True,
+                            hide_index=True,
+                        )
+                        pick = st.selectbox(
+                            "查看詳情",
+                            range(len(high_risk)),
+                            format_func=lambda i: f"🔴 {high_risk_labels[i]}",
+                            key="high_risk_pick",
+                        )
+                        task = high_risk.iloc[pick]
                         st.write(f"**負責單位:** {task['owner']}")
                         st.write(f"**誤差天數:** {task['variance_days']} 天")
                         if pd.notna(task['plan_end']):
                             st.write(f"**計劃完成:** {task['plan_end'].strftime('%Y-%m-%d')}")
             
-            st.divider()
+                st.divider()
             
-            # 延遲項目清單
-            st.markdown("### 📋 完整延遲項目清單")
-            st.dataframe(
-                delay_df[['task', 'owner', 'plan_end', 'variance_days', 'notes']].rename(columns={
-                    'task': '任務', 'owner': '負責單位', 'plan_end': '計劃完成',
-                    'variance_days': '誤差天數', 'notes': '備註'
-                }),
-                use_container_width=True,
-                hide_index=True,
-            )
+                # 延遲項目清單
+                st.markdown("### 📋 完整延遲項目清單")
+                st.dataframe(
+                    delay_df[['task', 'owner', 'plan_end', 'variance_days', 'notes']].rename(columns={
+                        'task': '任務', 'owner': '負責單位', 'plan_end': '計劃完成',
+                        'variance_days': '誤差天數', 'notes': '備註'
+                    }),
+                    use_container_width=True,
+                    hide_index=True,
+                )
     
     # Tab 4: 區域進度
     with tab4:
-        st.subheader("🏭 系統時程 - 區域進度")
+        if tab4.open:
+            st.subheader("🏭 系統時程 - 區域進度")
 
-        area_fig = create_area_progress(df_system)
-        if area_fig:
-            st.plotly_chart(area_fig, use_container_width=True)
+            area_fig = create_area_progress(df_system)
+            if area_fig:
+                st.plotly_chart(area_fig, use_container_width=True)
 
-        st.divider()
+            st.divider()
 
-        # 各區域詳細進度（主項目/次項目分開顯示）
-        areas = df_system[df_system['is_area'] == True]['item'].unique()
-
-        for area in areas:
-            with st.expander(f"📍 {area}"):
-                area_items = df_system[(df_system['area'] == area) & (df_system['is_area'] == False)]
-                if not area_items.empty:
-                    # 取得該區域的主項目
-                    main_items = area_items[area_items['is_main'] == True]['item'].unique()
-
-                    for main_item in main_items:
-                        # 主項目標題
-                        main_row = area_items[area_items['item'] == main_item].iloc[0]
-                        main_pct = main_row['completion_pct'] if pd.notna(main_row['completion_pct']) else 0
-                        main_color = '#28a745' if main_pct >= 70 else '#ffc107' if main_pct >= 30 else '#dc3545'
-
-                        st.markdown(f"""
-                        <div style="padding: 8px 0; margin: 8px 0 2px 0; border-left: 4px solid {main_color}; padding-left: 12px;">
-                            <div style="display: flex; align-items: center;">
-                                <div style="font-weight: bold; font-size: 1.05em; min-width: 200px; flex-shrink: 0;">▶ {main_item[:40]}</div>
-                                <div style="flex: 1; background: rgba(128,128,128,0.3); border-radius: 4px; height: 20px; margin: 0 10px; min-width: 100px;">
-                                    <div style="width: {main_pct}%; background: {main_color}; height: 100%; border-radius: 4px;"></div>
-                                </div>
-                                <div style="width: 50px; text-align: right; font-weight: bold;">{main_pct:.0f}%</div>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                        # 該主項目下的次項目
-                        sub_items = area_items[(area_items['main_item'] == main_item) & (area_items['is_main'] == False)]
-                        if not sub_items.empty:
-                            for _, sub_row in sub_items.iterrows():
-                                sub_pct = sub_row['completion_pct'] if pd.notna(sub_row['completion_pct']) else 0
-                                sub_color = '#28a745' if sub_pct >= 70 else '#ffc107' if sub_pct >= 30 else '#dc3545'
-                                st.markdown(f"""
-                                <div style="display: flex; align-items: center; margin: 2px 0; padding-left: 40px; opacity: 0.9;">
-                                    <div style="min-width: 180px; flex-shrink: 0; font-size: 0.95em;">└ {sub_row['item'][:35]}</div>
-                                    <div style="flex: 1; background: rgba(128,128,128,0.2); border-radius: 4px; height: 14px; margin: 0 10px; min-width: 80px;">
-                                        <div style="width: {sub_pct}%; background: {sub_color}; height: 100%; border-radius: 4px;"></div>
-                                    </div>
-                                    <div style="width: 50px; text-align: right; font-size: 0.9em;">{sub_pct:.0f}%</div>
-                                </div>
-                                """, unsafe_allow_html=True)
-
-                    # 處理沒有主項目的次項目（直接屬於區域的項目）
-                    orphan_items = area_items[(area_items['main_item'] == '') & (area_items['is_main'] == False)]
-                    if not orphan_items.empty:
-                        st.markdown("<div style='margin-top: 12px; padding-left: 12px; border-left: 4px solid #6c757d;'><strong>其他項目</strong></div>", unsafe_allow_html=True)
-                        for _, item in orphan_items.iterrows():
-                            pct = item['completion_pct'] if pd.notna(item['completion_pct']) else 0
-                            color = '#28a745' if pct >= 70 else '#ffc107' if pct >= 30 else '#dc3545'
-                            st.markdown(f"""
-                            <div style="display: flex; align-items: center; margin: 2px 0; padding-left: 40px; opacity: 0.9;">
-                                <div style="min-width: 180px; flex-shrink: 0; font-size: 0.95em;">• {item['item'][:35]}</div>
-                                <div style="flex: 1; background: rgba(128,128,128,0.2); border-radius: 4px; height: 14px; margin: 0 10px; min-width: 80px;">
-                                    <div style="width: {pct}%; background: {color}; height: 100%; border-radius: 4px;"></div>
-                                </div>
-                                <div style="width: 50px; text-align: right; font-size: 0.9em;">{pct:.0f}%</div>
-                            </div>
-                            """, unsafe_allow_html=True)
+            # 各區域詳細進度（主項目/次項目分開顯示）
+            areas = df_system.loc[df_system['is_area'], 'item'].unique()
+
+            # 一次算好所有項目的進度條 HTML 並依區域分組，每個區域只輸出一次 markdown
+            area_groups = dict(list(
+                build_item_progress_html(df_system[~df_system['is_area']])
+                .groupby('area', sort=False, observed=True)
+            ))
+
+            for area in areas:
+                with st.expander(f"📍 {area}"):
+                    area_items = area_groups.get(area)
+                    if area_items is not None and not area_items.empty:
+                        # 取得該區域的主項目，並依主項目分組次項目
+                        main_html = area_items[area_items['is_main']].drop_duplicates('item').set_index('item')['bar_html']
+                        sub_groups = dict(list(
+                            area_items[~area_items['is_main']].groupby('main_item', sort=False)['bar_html']
+                        ))
+
+                        parts = []
+                        for main_item, html in main_html.items():
+                            parts.append(html)
+                            # 該主項目下的次項目
+                            if main_item in sub_groups:
+                                parts.extend(sub_groups[main_item])
+
+                        # 處理沒有主項目的次項目（直接屬於區域的項目）
+                        if '' in sub_groups:
+                            parts.append("<div style='margin-top: 12px; padding-left: 12px; border-left: 4px solid #6c757d;'><strong>其他項目</strong></div>")
+                            parts.extend(sub_groups[''])
+
+                        st.markdown('\n'.join(parts), unsafe_allow_html=True)
     
     # Tab 5: 進度統計
     with tab5:
-        st.subheader("📋 進度統計")
+        if tab5.open:
+            st.subheader("📋 進度統計")
 
-        df_progress = data.get('progress_stats', pd.DataFrame())
+            df_progress = data.get('progress_stats', pd.DataFrame())
 
-        if df_progress.empty:
-            st.warning("⚠️ 未找到進度統計資料（需要包含「工作進度」的工作表）")
-        else:
-            items_row1 = ['C鋼', '軌道', 'HID', '踩點圖資', 'AreaSensor', '走行提速']
-            items_row2 = ['OHB安裝', 'OHB教點', 'OHBCycle', 'CycleTest']
-            all_items = items_row1 + items_row2
-
-            # 判斷區域欄位（可能是「區域」或「項目」）
-            area_col = None
-            if '項目' in df_progress.columns:
-                # 檢查「項目」欄位是否包含區域標識（如 A, B, C...）
-                sample_values = df_progress['項目'].dropna().head(10).astype(str).tolist()
-                if any(len(v) <= 2 for v in sample_values):  # 短名稱可能是區域
-                    area_col = '項目'
-            if area_col is None and '區域' in df_progress.columns:
-                area_col = '區域'
-
-            # 按區域/項目分開統計
-            st.markdown("### 📊 各區域完成統計")
-
-            if area_col:
-                # 取得所有區域（包括數字0）
-                areas = df_progress[area_col].dropna().unique()
-                areas = sorted([a for a in areas if str(a).strip()], key=lambda x: str(x))
-
-                for area in areas:
-                    area_data = df_progress[df_progress[area_col] == area]
-                    if area_data.empty:
-                        continue
-
-                    # 計算該區域完成項目數
-                    completed_count = 0
-                    total_count = 0
-                    for item in all_items:
-                        target_col = f'{item}_目標'
-                        actual_col = f'{item}_實際'
-                        if target_col in df_progress.columns and actual_col in df_progress.columns:
-                            if area_data[target_col].notna().any():
-                                total_count += 1
-                                if area_data[actual_col].notna().any():
-                                    completed_count += 1
-
-                    area_pct = (completed_count / total_count * 100) if total_count > 0 else 0
-                    area_color = '#28a745' if area_pct >= 70 else '#ffc107' if area_pct >= 30 else '#dc3545'
-
-                    with st.expander(f"📍 區域 {area} — 完成 {completed_count}/{total_count} 項 ({area_pct:.0f}%)", expanded=False):
-                        # 顯示各工程項目狀態
-                        st.markdown("**工程項目完成狀態：**")
-
-                        # 建立狀態顯示
+            if df_progress.empty:
+                st.warning("⚠️ 未找到進度統計資料（需要包含「工作進度」的工作表）")
+            else:
+                items_row1 = ['C鋼', '軌道', 'HID', '踩點圖資', 'AreaSensor', '走行提速']
+                items_row2 = ['OHB安裝', 'OHB教點', 'OHBCycle', 'CycleTest']
+                all_items = items_row1 + items_row2
+
+                # 判斷區域欄位（可能是「區域」或「項目」）
+                area_col = None
+                if '項目' in df_progress.columns:
+                    # 檢查「項目」欄位是否包含區域標識（如 A, B, C...）
+                    sample_values = df_progress['項目'].dropna().head(10).astype(str).tolist()
+                    if any(len(v) <= 2 for v in sample_values):  # 短名稱可能是區域
+                        area_col = '項目'
+                if area_col is None and '區域' in df_progress.columns:
+                    area_col = '區域'
+
+                # 按區域/項目分開統計
+                st.markdown("### 📊 各區域完成統計")
+
+                if area_col:
+                    # 取得所有區域（包括數字0）
+                    areas = df_progress[area_col].dropna().unique()
+                    areas = sorted([a for a in areas if str(a).strip()], key=lambda x: str(x))
+
+                    for area in areas:
+                        area_data = df_progress[df_progress[area_col] == area]
+                        if area_data.empty:
+                            continue
+
+                        # 計算該區域完成項目數
+                        completed_count = 0
+                        total_count = 0
                         for item in all_items:
                             target_col = f'{item}_目標'
                             actual_col = f'{item}_實際'
-                            if target_col in df_progress.columns:
-                                target_date = area_data[target_col].iloc[0] if not area_data[target_col].isna().all() else None
-                                actual_date = area_data[actual_col].iloc[0] if actual_col in df_progress.columns and not area_data[actual_col].isna().all() else None
-
-                                if pd.notna(target_date):
-                                    if pd.notna(actual_date):
-                                        status = "✅"
-                                        status_text = f"已完成 ({pd.to_datetime(actual_date).strftime('%m/%d') if pd.notna(actual_date) else ''})"
-                                        color = '#28a745'
+                            if target_col in df_progress.columns and actual_col in df_progress.columns:
+                                if area_data[target_col].notna().any():
+                                    total_count += 1
+                                    if area_data[actual_col].notna().any():
+                                        completed_count += 1
+
+                        area_pct = (completed_count / total_count * 100) if total_count > 0 else 0
+                        area_color = '#28a745' if area_pct >= 70 else '#ffc107' if area_pct >= 30 else '#dc3545'
+
+                        with st.expander(f"📍 區域 {area} — 完成 {completed_count}/{total_count} 項 ({area_pct:.0f}%)", expanded=False):
+                            # 顯示各工程項目狀態
+                            st.markdown("**工程項目完成狀態：**")
+
+                            # 建立狀態顯示
+                            for item in all_items:
+                                target_col = f'{item}_目標'
+                                actual_col = f'{item}_實際'
+                                if target_col in df_progress.columns:
+                                    target_date = area_data[target_col].iloc[0] if not area_data[target_col].isna().all() else None
+                                    actual_date = area_data[actual_col].iloc[0] if actual_col in df_progress.columns and not area_data[actual_col].isna().all() else None
+
+                                    if pd.notna(target_date):
+                                        if pd.notna(actual_date):
+                                            status = "✅"
+                                            status_text = f"已完成 ({pd.to_datetime(actual_date).strftime('%m/%d') if pd.notna(actual_date) else ''})"
+                                            color = '#28a745'
+                                        else:
+                                            status = "⏳"
+                                            status_text = f"目標 {pd.to_datetime(target_date).strftime('%m/%d') if pd.notna(target_date) else ''}"
+                                            color = '#ffc107'
                                     else:
-                                        status = "⏳"
-                                        status_text = f"目標 {pd.to_datetime(target_date).strftime('%m/%d') if pd.notna(target_date) else ''}"
-                                        color = '#ffc107'
-                                else:
-                                    status = "—"
-                                    status_text = "未排程"
-                                    color = '#6c757d'
-
-                                st.markdown(f"""
-                                <div style="display: flex; align-items: center; margin: 4px 0; padding: 4px 8px; border-left: 3px solid {color};">
-                                    <div style="width: 30px; font-size: 1.1em;">{status}</div>
-                                    <div style="width: 100px; font-weight: 500;">{item}</div>
-                                    <div style="flex: 1; font-size: 0.9em; opacity: 0.8;">{status_text}</div>
-                                </div>
-                                """, unsafe_allow_html=True)
-
-            st.divider()
-
-            # 全區域總計
-            st.markdown("### 📈 全區域總計")
-
-            # 第一排
-            cols1 = st.columns(len(items_row1))
-            for idx, item in enumerate(items_row1):
-                target_col = f'{item}_目標'
-                actual_col = f'{item}_實際'
-                if target_col in df_progress.columns and actual_col in df_progress.columns:
-                    total = df_progress[target_col].notna().sum()
-                    done = df_progress[actual_col].notna().sum()
-                    pct = (done / total * 100) if total > 0 else 0
-                    with cols1[idx]:
-                        st.metric(item, f"{done}/{total}", f"{pct:.0f}%")
-
-            # 第二排
-            cols2 = st.columns(len(items_row2))
-            for idx, item in enumerate(items_row2):
-                target_col = f'{item}_目標'
-                actual_col = f'{item}_實際'
-                if target_col in df_progress.columns and actual_col in df_progress.columns:
-                    total = df_progress[target_col].notna().sum()
-                    done = df_progress[actual_col].notna().sum()
-                    pct = (done / total * 100) if total > 0 else 0
-                    with cols2[idx]:
-                        st.metric(item, f"{done}/{total}", f"{pct:.0f}%")
-
-            # 全區域進度條
-            st.markdown("**各項進度：**")
-            for item in all_items:
-                target_col = f'{item}_目標'
-                actual_col = f'{item}_實際'
-                if target_col in df_progress.columns and actual_col in df_progress.columns:
-                    total = df_progress[target_col].notna().sum()
-                    done = df_progress[actual_col].notna().sum()
-                    pct = (done / total * 100) if total > 0 else 0
-                    color = '#28a745' if pct >= 70 else '#ffc107' if pct >= 30 else '#dc3545'
-                    st.markdown(f"""
-                    <div style="display: flex; align-items: center; margin: 5px 0;">
-                        <div style="width: 100px; font-size: 0.9em;">{item}</div>
-                        <div style="flex: 1; background: rgba(128,128,128,0.3); border-radius: 4px; height: 18px; margin: 0 10px;">
-                            <div style="width: {pct}%; background: {color}; height: 100%; border-radius: 4px;"></div>
-                        </div>
-                        <div style="width: 80px; text-align: right; font-size: 0.9em;">{done}/{total} ({pct:.0f}%)</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-            st.divider()
-
-            # 完整資料表格
-            st.markdown("### 📋 完整資料表格")
-            st.dataframe(df_progress, use_container_width=True, height=400)
-
-    # Tab 6: 專案編輯
-    with tab6:
-        st.subheader("✏️ 專案與任務編輯器")
-
-        # 提示：篩選與操作說明
-        st.info("💡 **使用提示：** 篩選與搜尋本身不會觸發頁面刷新。但執行操作（如新增、批量修改、儲存變更）後會重新載入頁面，此時會回到甘特圖分頁（這是 Streamlit 的限制）。修改完成後請前往「匯出」分頁儲存變更。")
-
-        # 初始化編輯歷史（用於撤銷/重做）
-        if 'edit_history' not in st.session_state:
-            st.session_state['edit_history'] = []
-            st.session_state['history_index'] = -1
-
-        # 顯示編輯狀態
-        status_col1, status_col2, status_col3 = st.columns([2, 1, 1])
-        with status_col1:
-            if 'last_edit_time' in st.session_state:
-                st.info(f"💡 最後編輯時間：{st.session_state['last_edit_time']}｜所有分頁已同步更新")
-        with status_col2:
-            # 撤銷按鈕
-            can_undo = st.session_state['history_index'] > 0
-            if st.button("↶ 撤銷", disabled=not can_undo, use_container_width=True, help="返回上一步操作"):
-                if can_undo:
-                    st.session_state['history_index'] -= 1
-                    st.session_state['edited_all_tasks'] = st.session_state['edit_history'][st.session_state['history_index']].copy()
-                    st.success("✅ 已撤銷上一步操作")
-                    st.rerun()
-        with status_col3:
-            # 重做按鈕
-            can_redo = st.session_state['history_index'] < len(st.session_state['edit_history']) - 1
-            if st.button("↷ 重做", disabled=not can_redo, use_container_width=True, help="重做已撤銷的操作"):
-                if can_redo:
-                    st.session_state['history_index'] += 1
-                    st.session_state['edited_all_tasks'] = st.session_state['edit_history'][st.session_state['history_index']].copy()
-                    st.success("✅ 已重做操作")
-                    st.rerun()
-
-        # 專案資訊編輯
-        st.markdown("### 📌 專案資訊")
-        with st.expander("點擊編輯專案資訊", expanded=False):
-            col1, col2 = st.columns(2)
-            with col1:
-                new_project_code = st.text_input("專案工令", value=st.session_state['edited_project_info'].get('project_code', ''))
-                new_project_name = st.text_input("專案名稱", value=st.session_state['edited_project_info'].get('project_name', ''))
-            with col2:
-                new_project_lead = st.text_input("專案負責人", value=st.session_state['edited_project_info'].get('project_lead', ''))
-                new_start_date = st.date_input("開始日期", value=pd.to_datetime(st.session_state['edited_project_info'].get('start_date')) if pd.notna(st.session_state['edited_project_info'].get('start_date')) else datetime.now())
-
-            if st.button("💾 更新專案資訊", key="update_project"):
-                st.session_state['edited_project_info']['project_code'] = new_project_code
-                st.session_state['edited_project_info']['project_name'] = new_project_name
-                st.session_state['edited_project_info']['project_lead'] = new_project_lead
-                st.session_state['edited_project_info']['start_date'] = new_start_date
-                st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                st.success("✅ 專案資訊已更新｜所有圖表已同步")
-                st.rerun()
-
-        st.divider()
-
-        # 任務編輯
-        st.markdown("### 📋 任務清單編輯")
-
-        # 篩選器
-        st.markdown("**🔍 篩選與搜尋：**")
-        filter_col1, filter_col2, filter_col3, filter_col4, filter_col5 = st.columns(5)
-        with filter_col1:
-            status_filter_edit = st.multiselect(
-                "篩選狀態",
-                options=['Done', 'Going', 'Delay'],
-                default=['Done', 'Going', 'Delay'],
-                key="status_filter_edit"
-            )
-        with filter_col2:
-            # 安全地獲取負責單位列表（移除 NaN 和空值）
-            owners_list = sorted([str(x) for x in st.session_state['edited_all_tasks']['owner'].dropna().unique() if str(x).strip()])
-            owner_filter_edit = st.multiselect("篩選負責單位", options=owners_list, key="owner_filter_edit")
-        with filter_col3:
-            # 主項目篩選
-            parent_filter_edit = st.selectbox(
-                "篩選主項目",
-                options=['全部', '僅主項目', '僅次項目'],
-                index=0,
-                key="parent_filter_edit"
-            )
-        with filter_col4:
-            search_edit = st.text_input("🔍 搜尋任務關鍵字", key="search_edit")
-        with filter_col5:
-            if st.button("🔄 清除篩選", use_container_width=True):
-                # 清除篩選條件（透過設定 key 的方式強制重設）
-                for key in ['status_filter_edit', 'owner_filter_edit', 'parent_filter_edit', 'search_edit']:
-                    if key in st.session_state:
-                        del st.session_state[key]
-                st.rerun()
-
-        st.divider()
-
-        # ========== 先定義篩選條件和變數 ==========
-        # 套用篩選條件
-        filtered_tasks = st.session_state['edited_all_tasks'].copy()
-
-        # 篩選狀態
-        if status_filter_edit:
-            filtered_tasks = filtered_tasks[filtered_tasks['status'].isin(status_filter_edit)]
-
-        # 篩選負責單位
-        if owner_filter_edit:
-            filtered_tasks = filtered_tasks[filtered_tasks['owner'].isin(owner_filter_edit)]
-
-        # 篩選主項目
-        if parent_filter_edit == '僅主項目':
-            filtered_tasks = filtered_tasks[filtered_tasks['is_parent'] == True]
-        elif parent_filter_edit == '僅次項目':
-            filtered_tasks = filtered_tasks[filtered_tasks['is_parent'] == False]
-
-        # 搜尋任務關鍵字
-        if search_edit:
-            filtered_tasks = filtered_tasks[
-                filtered_tasks['task'].str.contains(search_edit, case=False, na=False) |
-                filtered_tasks['notes'].str.contains(search_edit, case=False, na=False)
-            ]
-
-        # 獲取所有現有的負責單位（用於下拉選單）
-        existing_owners = [str(x) for x in st.session_state['edited_all_tasks']['owner'].dropna().unique() if str(x).strip()]
-        # 加入常用單位作為預設選項
-        common_owners = ['TIM SMA', 'TIM Controls', 'TIM Mechanical', 'TIM Electrical', 'Vendor']
-        owner_options = sorted(list(set(existing_owners + common_owners)))
-
-        # ========== 操作按鈕與批量操作 ==========
-        st.markdown("**操作：**")
-        op_col1, op_col2, op_col3, op_col4, op_col5 = st.columns(5)
-
-        with op_col1:
-            if st.button("➕ 新增任務", type="primary", use_container_width=True):
-                new_task = {
-                    'id': len(st.session_state['edited_all_tasks']) + 1,
-                    'row_index': len(st.session_state['edited_all_tasks']) + 6,
-                    'task': '新任務',
-                    'is_parent': False,  # 預設為子項目
-                    'level': 1,  # 預設為次項目
-                    'owner': '',
-                    'progress_pct': 0,
-                    'target_pct': 0,
-                    'remaining_days': 0,
-                    'status': 'Going',
-                    'plan_start': pd.Timestamp.now(),
-                    'plan_end': pd.Timestamp.now() + pd.Timedelta(days=7),
-                    'plan_days': 7,
-                    'actual_start': None,
-                    'actual_end': None,
-                    'actual_days': 0,
-                    'variance_days': 0,
-                    'coord_time': '',
-                    'coord_manpower': '',
-                    'coord_area': '',
-                    'coord_equipment': '',
-                    'notes': '',
-                }
-                st.session_state['edited_all_tasks'] = pd.concat([
-                    st.session_state['edited_all_tasks'],
-                    pd.DataFrame([new_task])
-                ], ignore_index=True)
-                st.rerun()
-
-        # 批量操作區域
-        with op_col2:
-            with st.popover("📝 批量修改狀態", use_container_width=True):
-                batch_status = st.selectbox("選擇新狀態", ["Done", "Going", "Delay"], key="batch_status")
-                batch_task_ids = st.multiselect(
-                    "選擇要修改的任務 ID",
-                    options=filtered_tasks['id'].tolist(),
-                    key="batch_status_ids"
-                )
-                if st.button("✅ 套用批量狀態修改", use_container_width=True):
-                    if batch_task_ids:
-                        for task_id in batch_task_ids:
-                            idx = st.session_state['edited_all_tasks'][st.session_state['edited_all_tasks']['id'] == task_id].index
-                            if len(idx) > 0:
-                                st.session_state['edited_all_tasks'].loc[idx[0], 'status'] = batch_status
-                        st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        st.success(f"✅ 已將 {len(batch_task_ids)} 個任務狀態改為 {batch_status}")
-                        st.rerun()
-                    else:
-                        st.warning("⚠️ 請選擇至少一個任務")
-
-        with op_col3:
-            with st.popover("👥 批量修改負責單位", use_container_width=True):
-                batch_owner = st.selectbox("選擇新負責單位", owner_options, key="batch_owner")
-                batch_owner_ids = st.multiselect(
-                    "選擇要修改的任務 ID",
-                    options=filtered_tasks['id'].tolist(),
-                    key="batch_owner_ids"
-                )
-                if st.button("✅ 套用批量負責單位修改", use_container_width=True):
-                    if batch_owner_ids:
-                        for task_id in batch_owner_ids:
-                            idx = st.session_state['edited_all_tasks'][st.session_state['edited_all_tasks']['id'] == task_id].index
-                            if len(idx) > 0:
-                                st.session_state['edited_all_tasks'].loc[idx[0], 'owner'] = batch_owner
-                        st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        st.success(f"✅ 已將 {len(batch_owner_ids)} 個任務負責單位改為 {batch_owner}")
-                        st.rerun()
-                    else:
-                        st.warning("⚠️ 請選擇至少一個任務")
-
-        with op_col4:
-            with st.popover("🗑️ 批量刪除", use_container_width=True):
-                batch_delete_ids = st.multiselect(
-                    "選擇要刪除的任務 ID",
-                    options=filtered_tasks['id'].tolist(),
-                    key="batch_delete_ids"
-                )
-                st.warning(f"⚠️ 將刪除 {len(batch_delete_ids)} 個任務，此操作無法復原")
-                if st.button("🗑️ 確認批量刪除", type="secondary", use_container_width=True):
-                    if batch_delete_ids:
-                        st.session_state['edited_all_tasks'] = st.session_state['edited_all_tasks'][
-                            ~st.session_state['edited_all_tasks']['id'].isin(batch_delete_ids)
-                        ].reset_index(drop=True)
-                        # 重新計算 ID
-                        st.session_state['edited_all_tasks']['id'] = range(1, len(st.session_state['edited_all_tasks']) + 1)
-                        st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        st.success(f"✅ 已刪除 {len(batch_delete_ids)} 個任務")
-                        st.rerun()
-                    else:
-                        st.warning("⚠️ 請選擇至少一個任務")
-
-        with op_col5:
-            with st.popover("📋 複製任務", use_container_width=True):
-                copy_task_id = st.selectbox(
-                    "選擇要複製的任務 ID",
-                    options=filtered_tasks['id'].tolist(),
-                    key="copy_task_id"
-                )
-                copy_count = st.number_input("複製份數", min_value=1, max_value=10, value=1, key="copy_count")
-
-                if st.button("📋 確認複製", use_container_width=True):
-                    if copy_task_id:
-                        # 找到要複製的任務
-                        original_task = st.session_state['edited_all_tasks'][
-                            st.session_state['edited_all_tasks']['id'] == copy_task_id
-                        ]
-
-                        if not original_task.empty:
-                            # 複製任務
-                            for i in range(copy_count):
-                                new_task = original_task.iloc[0].to_dict()
-                                new_task['id'] = len(st.session_state['edited_all_tasks']) + 1
-                                new_task['row_index'] = len(st.session_state['edited_all_tasks']) + 6
-                                new_task['task'] = f"{new_task['task']} (副本{i+1})"
-
-                                st.session_state['edited_all_tasks'] = pd.concat([
-                                    st.session_state['edited_all_tasks'],
-                                    pd.DataFrame([new_task])
-                                ], ignore_index=True)
-
-                            # 重新計算 ID
-                            st.session_state['edited_all_tasks']['id'] = range(1, len(st.session_state['edited_all_tasks']) + 1)
-
-                            st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            st.success(f"✅ 已複製 {copy_count} 個任務")
-                            st.rerun()
-                        else:
-                            st.error("❌ 找不到要複製的任務")
-
-        # 顯示選項
-        show_all = st.checkbox("顯示所有欄位", value=False)
-
-        # 顯示篩選結果數量
-        st.caption(f"📊 顯示 {len(filtered_tasks)} / {len(st.session_state['edited_all_tasks'])} 個任務")
-
-        # 檢查是否有篩選結果
-        if filtered_tasks.empty:
-            st.warning("⚠️ 沒有符合篩選條件的任務")
-            st.stop()
-
-        # 準備顯示用的資料（加入層級標記，與 Excel 一致）
-        display_tasks = filtered_tasks.copy()
-
-        def format_task_with_level(row):
-            """根據層級格式化任務名稱"""
-            try:
-                level = row.get('level', 0) if hasattr(row, 'get') else 0
-                task_name = str(row['task']) if 'task' in row else ''
-
-                if level == 0:
-                    # 主項目
-                    return f"■ {task_name}"
-                elif level == 1:
-                    # 次項目
-                    return f"  ├─ {task_name}"
-                elif level == 2:
-                    # 次次項目
-                    return f"    └─ {task_name}"
-                else:
-                    # 更深層級
-                    indent = "  " * level
-                    return f"{indent}└─ {task_name}"
-            except Exception as e:
-                # 如果格式化失敗，返回原始任務名稱
-                return str(row.get('task', '')) if hasattr(row, 'get') else ''
-
-        # 安全地應用格式化函數
-        try:
-            display_tasks['task_display'] = display_tasks.apply(format_task_with_level, axis=1)
-        except Exception as e:
-            # 如果應用失敗，使用原始任務名稱
-            display_tasks['task_display'] = display_tasks['task'].astype(str)
-
-        # 可編輯的任務表格
-        if show_all:
-            # 顯示所有欄位
-            edit_columns = ['id', 'task_display', 'owner', 'status', 'plan_start', 'plan_end',
-                          'plan_days', 'actual_start', 'actual_end', 'progress_pct',
-                          'variance_days', 'notes']
-            column_names = {
-                'id': 'ID', 'task_display': '任務名稱', 'owner': '負責單位', 'status': '狀態',
-                'plan_start': '計劃開始', 'plan_end': '計劃完成', 'plan_days': '計劃天數',
-                'actual_start': '實際開始', 'actual_end': '實際完成',
-                'progress_pct': '完成%', 'variance_days': '誤差天數', 'notes': '備註'
-            }
-        else:
-            # 只顯示主要欄位
-            edit_columns = ['id', 'task_display', 'owner', 'status', 'plan_start', 'plan_end', 'notes']
-            column_names = {
-                'id': 'ID', 'task_display': '任務名稱', 'owner': '負責單位', 'status': '狀態',
-                'plan_start': '計劃開始', 'plan_end': '計劃完成', 'notes': '備註'
-            }
-
-        # 可編輯的任務表格
-        edited_tasks_df = st.data_editor(
-            display_tasks[edit_columns].rename(columns=column_names),
-            column_config={
-                "ID": st.column_config.NumberColumn("ID", disabled=True, width="small"),
-                "任務名稱": st.column_config.TextColumn("任務名稱", width="large"),
-                "負責單位": st.column_config.SelectboxColumn("負責單位", options=owner_options, width="medium"),
-                "狀態": st.column_config.SelectboxColumn("狀態", options=["Done", "Going", "Delay"], width="small"),
-                "計劃開始": st.column_config.DateColumn("計劃開始", format="YYYY-MM-DD"),
-                "計劃完成": st.column_config.DateColumn("計劃完成", format="YYYY-MM-DD"),
-                "計劃天數": st.column_config.NumberColumn("計劃天數", width="small", disabled=True),
-                "實際開始": st.column_config.DateColumn("實際開始", format="YYYY-MM-DD"),
-                "實際完成": st.column_config.DateColumn("實際完成", format="YYYY-MM-DD"),
-                "完成%": st.column_config.NumberColumn("完成%", min_value=0, max_value=100, format="%.0f%%", width="small"),
-                "誤差天數": st.column_config.NumberColumn("誤差天數", width="small", disabled=True),
-                "備註": st.column_config.TextColumn("備註", width="large"),
-            },
-            num_rows="dynamic",  # 允許新增/刪除行
-            use_container_width=True,
-            hide_index=True,
-            key="task_editor"
-        )
-
-        # 儲存變更
-        col1, col2, col3 = st.columns([1, 1, 2])
-        with col1:
-            if st.button("💾 儲存所有變更", type="primary", use_container_width=True):
-                # 還原欄位名稱
-                reverse_column_names = {v: k for k, v in column_names.items()}
-                edited_tasks_df_copy = edited_tasks_df.rename(columns=reverse_column_names)
-
-                # 清理任務名稱（移除層級標記）
-                if 'task_display' in edited_tasks_df_copy.columns:
-                    def clean_task_name(x):
-                        if pd.isna(x):
-                            return ''
-                        # 移除所有層級符號
-                        cleaned = str(x)
-                        cleaned = cleaned.replace('■ ', '')  # 主項目
-                        cleaned = cleaned.replace('├─ ', '')  # 次項目
-                        cleaned = cleaned.replace('└─ ', '')  # 次次項目
-                        cleaned = cleaned.strip()
-                        return cleaned
-
-                    edited_tasks_df_copy['task'] = edited_tasks_df_copy['task_display'].apply(clean_task_name)
-                    edited_tasks_df_copy = edited_tasks_df_copy.drop(columns=['task_display'])
-
-                # ========== 資料驗證 ==========
-                validation_errors = []
-
-                for idx, row in edited_tasks_df_copy.iterrows():
-                    task_id = idx + 1
-
-                    # 1. 必填欄位檢查
-                    if pd.isna(row.get('task')) or str(row.get('task', '')).strip() == '':
-                        validation_errors.append(f"第 {task_id} 行：任務名稱不能為空")
-
-                    if pd.isna(row.get('owner')) or str(row.get('owner', '')).strip() == '':
-                        validation_errors.append(f"第 {task_id} 行：負責單位不能為空")
-
-                    if pd.isna(row.get('status')) or str(row.get('status', '')).strip() == '':
-                        validation_errors.append(f"第 {task_id} 行：狀態不能為空")
-
-                    # 2. 日期邏輯檢查
-                    plan_start = row.get('plan_start')
-                    plan_end = row.get('plan_end')
-
-                    if pd.notna(plan_start) and pd.notna(plan_end):
-                        if pd.to_datetime(plan_start) > pd.to_datetime(plan_end):
-                            validation_errors.append(f"第 {task_id} 行：計劃開始日期 ({plan_start}) 不能晚於計劃完成日期 ({plan_end})")
-
-                    # 檢查實際日期
-                    if 'actual_start' in row and 'actual_end' in row:
-                        actual_start = row.get('actual_start')
-                        actual_end = row.get('actual_end')
-
-                        if pd.notna(actual_start) and pd.notna(actual_end):
-                            if pd.to_datetime(actual_start) > pd.to_datetime(actual_end):
-                                validation_errors.append(f"第 {task_id} 行：實際開始日期不能晚於實際完成日期")
-
-                    # 3. 百分比範圍檢查
-                    if 'progress_pct' in row:
-                        progress = row.get('progress_pct')
-                        if pd.notna(progress):
-                            try:
-                                progress_val = float(progress)
-                                if progress_val < 0 or progress_val > 100:
-                                    validation_errors.append(f"第 {task_id} 行：完成百分比必須在 0-100 之間（目前：{progress_val}）")
-                            except (ValueError, TypeError):
-                                validation_errors.append(f"第 {task_id} 行：完成百分比格式錯誤")
-
-                # 顯示驗證錯誤
-                if validation_errors:
-                    st.error("❌ 資料驗證失敗，請修正以下錯誤：")
-                    for error in validation_errors[:10]:  # 最多顯示 10 個錯誤
-                        st.error(f"• {error}")
-                    if len(validation_errors) > 10:
-                        st.error(f"... 還有 {len(validation_errors) - 10} 個錯誤未顯示")
-                else:
-                    # 驗證通過，儲存資料
-                    # 儲存到歷史記錄（用於撤銷/重做）
-                    if len(st.session_state['edit_history']) == 0 or not st.session_state['edited_all_tasks'].equals(st.session_state['edit_history'][-1]):
-                        # 清除重做歷史
-                        st.session_state['edit_history'] = st.session_state['edit_history'][:st.session_state['history_index'] + 1]
-                        # 加入新歷史
-                        st.session_state['edit_history'].append(st.session_state['edited_all_tasks'].copy())
-                        st.session_state['history_index'] = len(st.session_state['edit_history']) - 1
-                        # 限制歷史記錄數量（最多 20 步）
-                        if len(st.session_state['edit_history']) > 20:
-                            st.session_state['edit_history'] = st.session_state['edit_history'][-20:]
-                            st.session_state['history_index'] = 19
-
-                    # 更新 edited_all_tasks 的對應欄位
-                    for col in edit_columns:
-                        if col in edited_tasks_df_copy.columns:
-                            st.session_state['edited_all_tasks'][col] = edited_tasks_df_copy[col]
-
-                    # 重新計算 ID
-                    st.session_state['edited_all_tasks']['id'] = range(1, len(st.session_state['edited_all_tasks']) + 1)
-
-                    # 更新時間戳記
-                    st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-                    # 儲存當前狀態到歷史
-                    st.session_state['edit_history'].append(st.session_state['edited_all_tasks'].copy())
-                    st.session_state['history_index'] = len(st.session_state['edit_history']) - 1
-
-                    st.success(f"✅ 已儲存 {len(edited_tasks_df_copy)} 個任務的變更｜所有圖表已同步")
-                    st.info("💡 所有分頁的圖表已更新，前往「匯出」分頁下載 Excel")
-                    st.rerun()
-
-        with col2:
-            if st.button("🔄 重置為原始資料", use_container_width=True):
-                st.session_state['edited_project_info'] = data['project_info'].copy()
-                st.session_state['edited_all_tasks'] = data['tasks'].copy()
-                st.session_state['edited_system_tasks'] = data['system_tasks'].copy()
-                if 'last_edit_time' in st.session_state:
-                    del st.session_state['last_edit_time']
-                st.success("✅ 已重置為原始資料")
-                st.rerun()
-
-        with col3:
-            st.markdown("**提示：** 可直接在表格中編輯、新增或刪除行（點擊行號旁的 ✖️）")
-
-        st.divider()
-        st.divider()
-
-        # ========== 系統時程編輯 ==========
-        st.markdown("### 🏭 系統時程編輯")
-        st.info("💡 編輯各區域的完成百分比、目標日期等資訊")
-
-        # 系統時程編輯器
-        if not df_system.empty and 'edited_system_tasks' in st.session_state:
-            system_col1, system_col2 = st.columns([3, 1])
-
-            with system_col1:
-                # 只顯示區域（is_area == True）的項目
-                area_tasks = st.session_state['edited_system_tasks'][
-                    st.session_state['edited_system_tasks']['is_area'] == True
-                ].copy()
-
-                if not area_tasks.empty:
-                    # 可編輯的系統時程表格
-                    system_edit_columns = ['item', 'completion_pct', 'target_date', 'hierarchy']
-                    system_column_names = {
-                        'item': '項目', 'completion_pct': '完成百分比',
-                        'target_date': '目標日期', 'hierarchy': '階層'
-                    }
-
-                    # 準備編輯用的數據 - 確保數據類型正確
-                    area_tasks_for_edit = area_tasks[system_edit_columns].copy()
-
-                    # 確保 completion_pct 是 float 類型
-                    if 'completion_pct' in area_tasks_for_edit.columns:
-                        area_tasks_for_edit['completion_pct'] = pd.to_numeric(
-                            area_tasks_for_edit['completion_pct'],
-                            errors='coerce'
-                        ).fillna(0.0)
-
-                    # 確保 target_date 是 datetime 類型（可以為 None）
-                    if 'target_date' in area_tasks_for_edit.columns:
-                        # 嘗試轉換為 datetime，失敗則設為 None
-                        try:
-                            area_tasks_for_edit['target_date'] = pd.to_datetime(
-                                area_tasks_for_edit['target_date'],
-                                errors='coerce'
-                            )
-                        except:
-                            area_tasks_for_edit['target_date'] = None
-
-                    # 確保 notes 是字符串類型
-                    if 'notes' in area_tasks_for_edit.columns:
-                        area_tasks_for_edit['notes'] = area_tasks_for_edit['notes'].fillna('').astype(str)
-
-                    edited_system_df = st.data_editor(
-                        area_tasks_for_edit.rename(columns=system_column_names),
+                                        status = "—"
+                                        status_text = "未排程"
+                                        color = '#6c757d'
+
+                                    st.markdown(f"""
+                                    <div style="display: flex; align-items: center; margin: 4px 0; padding: 4px 8px; border-left: 3px solid {color};">
+                                        <div style="width: 30px; font-size: 1.1em;">{status}</div>
+                                        <div style="width: 100px; font-weight: 500;">{item}</div>
+                                        <div style="flex: 1; font-size: 0.9em; opacity: 0.8;">{status_text}</div>
+                                    </div>
+                                    """, unsafe_allow_html=True)
+
+                st.divider()
+
+                # 全區域總計
+                st.markdown("### 📈 全區域總計")
+
+                # 第一排
+                cols1 = st.columns(len(items_row1))
+                for idx, item in enumerate(items_row1):
+                    target_col = f'{item}_目標'
+                    actual_col = f'{item}_實際'
+                    if target_col in df_progress.columns and actual_col in df_progress.columns:
+                        total = df_progress[target_col].notna().sum()
+                        done = df_progress[actual_col].notna().sum()
+                        pct = (done / total * 100) if total > 0 else 0
+                        with cols1[idx]:
+                            st.metric(item, f"{done}/{total}", f"{pct:.0f}%")
+
+                # 第二排
+                cols2 = st.columns(len(items_row2))
+                for idx, item in enumerate(items_row2):
+                    target_col = f'{item}_目標'
+                    actual_col = f'{item}_實際'
+                    if target_col in df_progress.columns and actual_col in df_progress.columns:
+                        total = df_progress[target_col].notna().sum()
+                        done = df_progress[actual_col].notna().sum()
+                        pct = (done / total * 100) if total > 0 else 0
+                        with cols2[idx]:
+                            st.metric(item, f"{done}/{total}", f"{pct:.0f}%")
+
+                # 全區域進度條（使用原生 ProgressColumn，避免逐列輸出 HTML）
+                st.markdown("**各項進度：**")
+                progress_items = [item for item in all_items
+                                  if f'{item}_目標' in df_progress.columns and f'{item}_實際' in df_progress.columns]
+                if progress_items:
+                    totals = df_progress[[f'{item}_目標' for item in progress_items]].notna().sum().to_numpy()
+                    dones = df_progress[[f'{item}_實際' for item in progress_items]].notna().sum().to_numpy()
+                    item_progress = pd.DataFrame({
+                        '項目': progress_items,
+                        '完成': dones,
+                        '總數': totals,
+                    })
+                    item_progress['完成率'] = (item_progress['完成'] / item_progress['總數'].where(item_progress['總數'] > 0) * 100).fillna(0)
+                    st.dataframe(
+                        item_progress,
                         column_config={
-                            "區域": st.column_config.TextColumn("區域", disabled=True, width="medium"),
-                            "完成百分比": st.column_config.NumberColumn(
-                                "完成百分比",
-                                min_value=0,
-                                max_value=100,
-                                format="%.1f%%",
-                                width="small",
-                                help="輸入 0-100 之間的數值（例如：75 代表 75%）"
-                            ),
-                            "目標日期": st.column_config.DateColumn("目標日期", format="YYYY-MM-DD"),
-                            "備註": st.column_config.TextColumn("備註", width="large"),
+                            "完成率": st.column_config.ProgressColumn("完成率", min_value=0, max_value=100, format="%.0f%%"),
                         },
                         use_container_width=True,
                         hide_index=True,
-                        key="system_editor"
                     )
 
-                    st.caption(f"📊 共有 {len(edited_system_df)} 個區域")
+                st.divider()
 
-            with system_col2:
-                st.markdown("**系統時程操作：**")
+                # 完整資料表格
+                st.markdown("### 📋 完整資料表格")
+                st.dataframe(df_progress, use_container_width=True, height=400)
 
-                if st.button("💾 儲存系統時程", type="primary", use_container_width=True):
-                    # 還原欄位名稱
-                    reverse_system_names = {v: k for k, v in system_column_names.items()}
-                    edited_system_copy = edited_system_df.rename(columns=reverse_system_names)
-
-                    # 更新 session_state 中的系統時程資料（只更新區域項目）
-                    area_indices = area_tasks.index
-                    for col in system_edit_columns:
-                        if col in edited_system_copy.columns:
-                            st.session_state['edited_system_tasks'].loc[area_indices, col] = edited_system_copy[col].values
-
-                    st.session_state['last_edit_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    st.success("✅ 系統時程已更新")
-                    st.rerun()
-
-                if st.button("🔄 重置系統時程", use_container_width=True):
-                    st.session_state['edited_system_tasks'] = data['system_tasks'].copy()
-                    st.success("✅ 已重置為原始系統時程")
-                    st.rerun()
-        else:
-            st.warning("⚠️ 未偵測到系統時程資料")
+    # Tab 6: 專案編輯
+    with tab6:
+        render_task_editor(data, df_system)
 
     # Tab 7: 週報生成
     with tab7:
@@ -2656,7 +3018,14 @@ def main():
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            report_content = generate_weekly_report(data, datetime.combine(report_date, datetime.min.time()))
+            # 週報只在按下「產生週報」或換檔案／報表日期時重新產生，其餘重跑直接沿用上次內容
+            report_key = (uploaded_file.file_id, report_date)
+            cached_report = st.session_state.get('weekly_report_cache')
+            if st.button("🔄 產生週報") or cached_report is None or cached_report[0] != report_key:
+                report_content = cached_weekly_report(data['tasks'], data['project_info'], datetime.combine(report_date, datetime.min.time()))
+                st.session_state['weekly_report_cache'] = (report_key, report_content)
+            else:
+                report_content = cached_report[1]
             st.markdown(report_content)
         
         with col2:
@@ -2672,7 +3041,8 @@ def main():
             st.divider()
             
             st.markdown("### 📊 快速統計")
-            summary = generate_status_summary(data)
+            # 摘要快取最多保留一小時（見 cached_status_summary），「本週到期」不會整天停留在舊值
+            summary = cached_status_summary(data['tasks'])
             
             st.metric("完成率", f"{summary['done']/summary['total']*100:.1f}%")
             st.metric("延遲項目", summary['delay'])
@@ -2721,38 +3091,28 @@ def main():
                         st.success("✅ 通知設定已儲存")
 
                 # 發送通知按鈕
+                notify_cfg = st.session_state['notification_config']
                 notify_col1, notify_col2 = st.columns(2)
 
                 with notify_col1:
                     if st.button("📊 發送週報", use_container_width=True):
-                        config = NotificationConfig()
-                        config.teams_enabled = st.session_state['notification_config']['teams_enabled']
-                        config.teams_webhook_url = st.session_state['notification_config']['teams_webhook']
-
-                        notifier = ProjectNotifier(config)
+                        notifier = get_notifier(notify_cfg['teams_webhook'], notify_cfg['teams_enabled'])
                         notifier.send_weekly_report(report_content, project_info.get('project_name', 'OHTC 專案'))
                         st.success("✅ 週報已發送！")
 
                 with notify_col2:
                     if st.button("⚠️ 發送延遲警報", use_container_width=True):
-                        delay_tasks = df_tasks[df_tasks['status'] == 'Delay'].to_dict('records')
+                        # 通知只用到任務、負責單位與誤差天數，只轉換需要的欄位
+                        delay_tasks = delay_df[['task', 'owner', 'variance_days']].to_dict('records')
                         if delay_tasks:
-                            config = NotificationConfig()
-                            config.teams_enabled = st.session_state['notification_config']['teams_enabled']
-                            config.teams_webhook_url = st.session_state['notification_config']['teams_webhook']
-
-                            notifier = ProjectNotifier(config)
+                            notifier = get_notifier(notify_cfg['teams_webhook'], notify_cfg['teams_enabled'])
                             notifier.send_delay_alert(delay_tasks, project_info.get('project_name', 'OHTC 專案'))
                             st.success(f"✅ 已發送 {len(delay_tasks)} 個延遲項目的警報！")
                         else:
                             st.info("💡 目前沒有延遲項目")
 
                 if st.button("📈 發送每日摘要", use_container_width=True):
-                    config = NotificationConfig()
-                    config.teams_enabled = st.session_state['notification_config']['teams_enabled']
-                    config.teams_webhook_url = st.session_state['notification_config']['teams_webhook']
-
-                    notifier = ProjectNotifier(config)
+                    notifier = get_notifier(notify_cfg['teams_webhook'], notify_cfg['teams_enabled'])
                     notifier.send_daily_summary(summary, project_info.get('project_name', 'OHTC 專案'))
                     st.success("✅ 每日摘要已發送！")
             else:
@@ -2819,11 +3179,12 @@ def main():
                     st.markdown("#### 🖼️ Layout 圖片")
                     layout_images = data.get('layout_images', [])
                     st.write(f"共找到 {len(layout_images)} 張圖片")
-                    for idx, img_bytes in enumerate(layout_images):
-                        try:
-                            st.image(img_bytes, caption=f"Layout 圖片 {idx + 1}", use_container_width=True)
-                        except Exception as e:
-                            st.error(f"無法顯示圖片 {idx + 1}: {str(e)}")
+                    # 預覽圖縮小後快取，並以單一 st.image 呼叫一次送出
+                    thumbs, captions, failed = layout_thumbnails(layout_images)
+                    if thumbs:
+                        st.image(thumbs, caption=captions, use_container_width=True)
+                    for idx in failed:
+                        st.error(f"無法顯示圖片 {idx}")
         else:
             st.info("📝 此檔案中沒有「進度統計」、「EQ 工作清單」或「Layout 圖片」分頁")
 
@@ -2842,15 +3203,10 @@ def main():
                     tasks_to_export = st.session_state.get('edited_all_tasks', df_tasks)
                     project_to_export = st.session_state.get('edited_project_info', project_info)
 
-                    # 建立包含編輯資料的 data 字典
-                    export_data = {
-                        'project_info': project_to_export,
-                        'tasks': tasks_to_export,
-                        'system_tasks': data.get('system_tasks'),
-                        'raw_software': data.get('raw_software'),
-                    }
-
-                    excel_output = export_updated_excel(export_data, uploaded_file, tasks_to_export)
+                    # 資料未變更時重複點擊直接使用上次生成的檔案
+                    excel_output = cached_excel_export(
+                        uploaded_file.getvalue(), project_to_export, tasks_to_export, datetime.now().date()
+                    )
 
                     # 生成檔案名稱：專案名稱+安裝排程表+_日期+_v版號
                     export_filename = generate_export_filename(
@@ -2875,10 +3231,20 @@ def main():
 
             # 使用編輯過的資料
             csv_data = st.session_state.get('edited_all_tasks', df_tasks)
-            csv = csv_data.to_csv(index=False).encode('utf-8-sig')
+            csv_detailed = st.checkbox("詳細欄位", value=False, key="csv_detailed",
+                                       help="勾選後匯出所有欄位（含內部欄位）")
+
+            def build_csv():
+                # 直接以 utf-8-sig 寫入位元組緩衝區，省去先產生整份字串再 encode 的複本
+                csv_buffer = io.BytesIO()
+                export_cols = csv_data.columns if csv_detailed else [c for c in CSV_EXPORT_COLUMNS if c in csv_data.columns]
+                csv_data[export_cols].to_csv(csv_buffer, index=False, encoding='utf-8-sig')
+                return csv_buffer.getvalue()
+
+            # data 傳入函數：只有在使用者點擊下載時才產生內容，一般重跑不做序列化
             st.download_button(
                 label="⬇️ 下載 CSV",
-                data=csv,
+                data=build_csv,
                 file_name=f"任務清單_{datetime.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv"
             )
@@ -2891,15 +3257,17 @@ def main():
             json_project = st.session_state.get('edited_project_info', project_info)
             json_tasks = st.session_state.get('edited_all_tasks', df_tasks)
 
-            json_data = {
-                'project_info': json_project,
-                'task_count': len(json_tasks),
-                'exported_at': datetime.now().isoformat(),
-            }
+            def build_json():
+                json_data = {
+                    'project_info': json_project,
+                    'task_count': len(json_tasks),
+                    'exported_at': datetime.now().isoformat(),
+                }
+                return json.dumps(json_data, ensure_ascii=False, indent=2, default=str)
 
             st.download_button(
                 label="⬇️ 下載 JSON",
-                data=json.dumps(json_data, ensure_ascii=False, indent=2, default=str),
+                data=build_json,
                 file_name=f"專案摘要_{datetime.now().strftime('%Y%m%d')}.json",
                 mime="application/json"
             )
@@ -13,11 +13,12 @@ OHTC 專案管理 CLI 工具
 """
 
 import argparse
-import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
 
+from schedule_reader import read_software_tasks
+
 # 顏色輸出
 class Colors:
     RED = '\033[91m'
@@ -34,24 +35,10 @@ class Colors:
 def load_data(file_path):
     """載入 Excel 資料"""
     try:
-        df = pd.read_excel(file_path, sheet_name='軟體時程', header=None)
-        
-        tasks = []
-        for i in range(6, len(df)):
-            row = df.iloc[i]
-            task_name = row[0]
-            
-            if pd.notna(task_name) and str(task_name).strip():
-                task = {
-                    'task': str(task_name).strip(),
-                    'owner': str(row[2]) if pd.notna(row[2]) else '',
-                    'status': str(row[7]) if pd.notna(row[7]) else '',
-                    'plan_end': pd.to_datetime(row[9]) if pd.notna(row[9]) else None,
-                    'variance_days': int(row[14]) if pd.notna(row[14]) else 0,
-                }
-                tasks.append(task)
-        
-        return pd.DataFrame(tasks)
+        df = read_software_tasks(file_path)
+        # 狀態只有少數幾種，轉為 Categorical 讓比對與計數以整數代碼進行
+        df['status'] = df['status'].astype('category')
+        return df
     except Exception as e:
         print(f"{Colors.RED}錯誤: 無法載入檔案 - {e}{Colors.END}")
         sys.exit(1)
@@ -60,9 +47,10 @@ def load_data(file_path):
 def cmd_status(df):
     """顯示專案狀態摘要"""
     total = len(df)
-    done = len(df[df['status'] == 'Done'])
-    going = len(df[df['status'] == 'Going'])
-    delay = len(df[df['status'] == 'Delay'])
+    status_counts = df['status'].value_counts()
+    done = int(status_counts.get('Done', 0))
+    going = int(status_counts.get('Going', 0))
+    delay = int(status_counts.get('Delay', 0))
     
     print(f"\n{Colors.BOLD}═══════════════════════════════════════{Colors.END}")
     print(f"{Colors.BOLD}  📊 OHTC 專案狀態摘要{Colors.END}")
@@ -93,12 +81,12 @@ def cmd_delay(df):
         print(f"  {Colors.GREEN}🎉 太棒了！沒有延遲項目！{Colors.END}\n")
         return
     
-    for idx, task in delay_df.iterrows():
-        variance = task['variance_days']
+    for task in delay_df.itertuples(index=False):
+        variance = task.variance_days
         risk = "🔴 高" if abs(variance) > 7 else "🟡 中" if abs(variance) > 3 else "🟢 低"
         
-        print(f"  {Colors.RED}●{Colors.END} {task['task'][:40]}")
-        print(f"    負責: {task['owner']:<15} 誤差: {variance:+d} 天  風險: {risk}")
+        print(f"  {Colors.RED}●{Colors.END} {task.task[:40]}")
+        print(f"    負責: {task.owner:<15} 誤差: {variance:+d} 天  風險: {risk}")
         print()
 
 
@@ -118,12 +106,13 @@ def cmd_upcoming(df, days=7):
         print(f"  {Colors.GREEN}✓ 近期沒有到期項目{Colors.END}\n")
         return
     
-    for idx, task in upcoming.iterrows():
-        days_left = (task['plan_end'] - today).days
+    # 剩餘天數整欄一次計算
+    days_left_values = (upcoming['plan_end'] - today).dt.days.to_numpy()
+    for task, days_left in zip(upcoming.itertuples(index=False), days_left_values):
         urgency = "🔴" if days_left <= 2 else "🟡" if days_left <= 5 else "🟢"
         
-        print(f"  {urgency} {task['task'][:40]}")
-        print(f"    負責: {task['owner']:<15} 剩餘: {days_left} 天  截止: {task['plan_end'].strftime('%m/%d')}")
+        print(f"  {urgency} {task.task[:40]}")
+        print(f"    負責: {task.owner:<15} 剩餘: {days_left} 天  截止: {task.plan_end.strftime('%m/%d')}")
         print()
 
 
@@ -143,12 +132,12 @@ def cmd_search(df, keyword):
         'Delay': Colors.RED,
     }
     
-    for idx, task in results.iterrows():
-        color = status_colors.get(task['status'], Colors.WHITE)
-        status_icon = {'Done': '✅', 'Going': '🔄', 'Delay': '⚠️'}.get(task['status'], '❓')
+    for task in results.itertuples(index=False):
+        color = status_colors.get(task.status, Colors.WHITE)
+        status_icon = {'Done': '✅', 'Going': '🔄', 'Delay': '⚠️'}.get(task.status, '❓')
         
-        print(f"  {status_icon} {color}{task['task'][:50]}{Colors.END}")
-        print(f"    負責: {task['owner']:<15} 狀態: {task['status']}")
+        print(f"  {status_icon} {color}{task.task[:50]}{Colors.END}")
+        print(f"    負責: {task.owner:<15} 狀態: {task.status}")
         print()
 
 
@@ -158,8 +147,9 @@ def cmd_report(df):
     week_start = today - timedelta(days=today.weekday())
     
     total = len(df)
-    done = len(df[df['status'] == 'Done'])
-    delay = len(df[df['status'] == 'Delay'])
+    done = int(df['status'].value_counts().get('Done', 0))
+    delay_df = df[df['status'] == 'Delay']
+    delay = len(delay_df)
     
     print(f"\n{Colors.BOLD}{'═' * 50}{Colors.END}")
     print(f"{Colors.BOLD}  📋 OHTC 專案週報{Colors.END}")
@@ -173,12 +163,11 @@ def cmd_report(df):
     print(f"  - 延遲中: {delay} 項")
     
     print(f"\n{Colors.BOLD}  【延遲項目】{Colors.END}")
-    delay_df = df[df['status'] == 'Delay']
     if delay_df.empty:
         print("  - 無延遲項目 ✅")
     else:
-        for _, task in delay_df.head(5).iterrows():
-            print(f"  - {task['task'][:35]} ({task['owner']})")
+        for task in delay_df.head(5).itertuples(index=False):
+            print(f"  - {task.task[:35]} ({task.owner})")
         if len(delay_df) > 5:
             print(f"  - ... 還有 {len(delay_df) - 5} 項")
     
@@ -187,11 +176,11 @@ def cmd_report(df):
 
 def cmd_owner(df, owner_name=None):
     """按負責單位統計"""
-    owner_stats = df.groupby('owner').agg({
-        'task': 'count',
-        'status': lambda x: (x == 'Done').sum()
-    }).reset_index()
-    owner_stats.columns = ['owner', 'total', 'done']
+    # 先算出完成旗標，分組時只用內建的 count/sum 聚合
+    owner_stats = df.assign(is_done=df['status'] == 'Done').groupby('owner').agg(
+        total=('task', 'count'),
+        done=('is_done', 'sum'),
+    ).reset_index()
     owner_stats['pending'] = owner_stats['total'] - owner_stats['done']
     owner_stats = owner_stats[owner_stats['owner'] != ''].sort_values('total', ascending=False)
     
@@ -200,10 +189,10 @@ def cmd_owner(df, owner_name=None):
     print(f"  {'負責單位':<20} {'總數':>6} {'完成':>6} {'待辦':>6} {'完成率':>8}")
     print(f"  {'-' * 50}")
     
-    for _, row in owner_stats.iterrows():
-        rate = row['done'] / row['total'] * 100 if row['total'] > 0 else 0
+    for row in owner_stats.itertuples(index=False):
+        rate = row.done / row.total * 100 if row.total > 0 else 0
         color = Colors.GREEN if rate >= 70 else Colors.YELLOW if rate >= 30 else Colors.RED
-        print(f"  {row['owner']:<20} {row['total']:>6} {row['done']:>6} {row['pending']:>6} {color}{rate:>7.1f}%{Colors.END}")
+        print(f"  {row.owner:<20} {row.total:>6} {row.done:>6} {row.pending:>6} {color}{rate:>7.1f}%{Colors.END}")
     
     print()
 
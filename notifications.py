@@ -9,15 +9,48 @@ OHTC 專案通知系統
 - 自訂 Webhook
 """
 
+import re
+import queue
 import smtplib
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+from concurrent.futures import ThreadPoolExecutor, wait
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 import pandas as pd
 from typing import List, Dict, Optional
 import os
+from html import escape
+
+from schedule_reader import read_software_tasks
+
+# 連線逾時 3 秒、讀取逾時 10 秒：單一通道卡住時不會拖住其他通道
+WEBHOOK_TIMEOUT = (3, 10)
+SMTP_TIMEOUT = 10
+# 多通道平行發送時最多等待的秒數；逾時的通道留在背景繼續送完，不再拖住呼叫端
+SEND_ALL_TIMEOUT = 10
+
+# SMTP 連線池：同時最多 5 條連線，每條寄出 100 封後換新，避免伺服器端的單連線寄送上限
+SMTP_POOL_SIZE = 5
+SMTP_MAX_MESSAGES = 100
+
+# Webhook 遇到限流（429）或服務暫停（503）時以指數退避重試，這兩種回應代表請求未被處理
+# 500/502/504 與讀取逾時不重試：請求可能已被處理，重送會產生重複訊息
+# 不依 Retry-After 等待（伺服器可能要求數小時），三次退避合計約 2 秒，發送耗時維持有上限
+WEBHOOK_RETRY = Retry(
+    total=3, read=0, backoff_factor=0.3,
+    status_forcelist=(429, 503),
+    allowed_methods=frozenset(['POST']),
+    respect_retry_after_header=False,
+    raise_on_status=False,  # 重試用盡時回傳最後的回應，由各通道照常記錄狀態碼
+)
+
+# Markdown 粗體（**文字**）
+BOLD_PATTERN = re.compile(r'\*\*(.+?)\*\*')
 
 
 class NotificationConfig:
@@ -42,6 +75,11 @@ class NotificationConfig:
         # Line Notify 設定
         self.line_enabled = False
         self.line_token = os.getenv('LINE_NOTIFY_TOKEN', '')
+    
+    @property
+    def any_enabled(self) -> bool:
+        """是否至少啟用一個通道"""
+        return self.email_enabled or self.teams_enabled or self.slack_enabled or self.line_enabled
 
 
 class ProjectNotifier:
@@ -49,10 +87,53 @@ class ProjectNotifier:
     
     def __init__(self, config: NotificationConfig):
         self.config = config
+        # 閒置的 SMTP 連線（第一次寄信時才建立），項目為 (連線, 已寄出封數)
+        self._smtp_idle = queue.LifoQueue()
+        self._smtp_slots = threading.BoundedSemaphore(SMTP_POOL_SIZE)  # 同時使用中的連線數上限
+        self._smtp_lock = threading.Lock()  # 保護連線歸還與關閉
+        self._smtp_generation = 0  # close() 後遞增，關閉前借出的連線歸還時直接關閉
+        # 各通道的發送都在等網路回應，平行送出後總耗時約為最慢的通道
+        # （執行緒池在第一次平行發送時建立，close() 後再發送會重新建立）
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Webhook 共用同一個 Session，保持連線（keep-alive）以省下重複的 TCP/TLS 交握
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=WEBHOOK_RETRY)
+        self._http.mount('https://', adapter)
+        self._http.mount('http://', adapter)
+    
+    def close(self):
+        """關閉保留中的 SMTP 與 HTTP 連線，並結束發送用的執行緒"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        self._http.close()
+        self._close_smtp()
     
-    def send_delay_alert(self, delay_tasks: List[Dict], project_name: str = 'OHTC 專案'):
+    def _close_smtp(self):
+        """關閉所有閒置的 SMTP 連線；使用中的連線在寄完歸還時關閉"""
+        idle = []
+        with self._smtp_lock:
+            self._smtp_generation += 1
+            while not self._smtp_idle.empty():
+                idle.append(self._smtp_idle.get_nowait()[0])
+        for server in idle:
+            self._quit_smtp(server)
+    
+    @staticmethod
+    def _quit_smtp(server: smtplib.SMTP):
+        """結束 SMTP 連線（連線已中斷時忽略錯誤）"""
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+    
+    def send_delay_alert(self, delay_tasks: List[Dict], project_name: str = 'OHTC 專案',
+                         now: Optional[datetime] = None):
         """發送延遲警報"""
-        if not delay_tasks:
+        # 沒有任何啟用的通道時不必組訊息
+        if not delay_tasks or not self.config.any_enabled:
             return
         
         title = f"⚠️ {project_name} - 延遲警報"
@@ -63,19 +144,27 @@ class ProjectNotifier:
 共有 {len(delay_tasks)} 個任務延遲，需要立即關注：
 
 """
-        for task in delay_tasks[:10]:
-            message += f"- **{task['task']}** ({task['owner']})\n"
-            message += f"  誤差: {task.get('variance_days', 'N/A')} 天\n"
+        # 各段先收集成 list 再一次 join，避免反覆以 += 串接字串
+        parts = [message]
+        parts.extend(
+            f"- **{task['task']}** ({task['owner']})\n"
+            f"  誤差: {task.get('variance_days', 'N/A')} 天\n"
+            for task in delay_tasks[:10]
+        )
         
         if len(delay_tasks) > 10:
-            message += f"\n... 還有 {len(delay_tasks) - 10} 個延遲項目"
+            parts.append(f"\n... 還有 {len(delay_tasks) - 10} 個延遲項目")
         
-        message += f"\n\n發送時間: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        parts.append(f"\n\n發送時間: {(now or datetime.now()).strftime('%Y-%m-%d %H:%M')}")
+        message = ''.join(parts)
         
         self._send_all(title, message)
     
-    def send_daily_summary(self, summary: Dict, project_name: str = 'OHTC 專案'):
+    def send_daily_summary(self, summary: Dict, project_name: str = 'OHTC 專案',
+                           now: Optional[datetime] = None):
         """發送每日摘要"""
+        if not self.config.any_enabled:
+            return
         title = f"📊 {project_name} - 每日摘要"
         
         total = summary['total']
@@ -94,43 +183,70 @@ class ProjectNotifier:
 
 📅 **即將到期** (7天內)
 """
-        for task in summary.get('upcoming', [])[:5]:
-            message += f"- {task['task']} ({task['owner']})\n"
-        
-        message += f"\n發送時間: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        parts = [message]
+        parts.extend(f"- {task['task']} ({task['owner']})\n" for task in summary.get('upcoming', [])[:5])
+        parts.append(f"\n發送時間: {(now or datetime.now()).strftime('%Y-%m-%d %H:%M')}")
+        message = ''.join(parts)
         
         self._send_all(title, message)
     
     def send_weekly_report(self, report_content: str, project_name: str = 'OHTC 專案'):
         """發送週報"""
+        if not self.config.any_enabled:
+            return
         title = f"📋 {project_name} - 週報"
         self._send_all(title, report_content)
     
-    def send_milestone_complete(self, milestone: str, project_name: str = 'OHTC 專案'):
+    def send_milestone_complete(self, milestone: str, project_name: str = 'OHTC 專案',
+                                now: Optional[datetime] = None):
         """發送里程碑完成通知"""
+        if not self.config.any_enabled:
+            return
         title = f"🎉 {project_name} - 里程碑完成"
         message = f"""
 **恭喜！里程碑已完成**
 
 🎯 **{milestone}**
 
-完成時間: {datetime.now().strftime('%Y-%m-%d %H:%M')}
+完成時間: {(now or datetime.now()).strftime('%Y-%m-%d %H:%M')}
 """
         self._send_all(title, message)
     
     def _send_all(self, title: str, message: str):
-        """發送到所有啟用的通道"""
+        """發送到所有啟用的通道（多個通道時平行發送，等待全部完成）"""
+        if not self.config.any_enabled:
+            return
+        
+        jobs = []
         if self.config.email_enabled:
-            self._send_email(title, message)
+            jobs.append((self._send_email, (title, message)))
         
         if self.config.teams_enabled:
-            self._send_teams(title, message)
+            jobs.append((self._send_teams, (title, message)))
         
         if self.config.slack_enabled:
-            self._send_slack(title, message)
+            jobs.append((self._send_slack, (title, message)))
         
         if self.config.line_enabled:
-            self._send_line(f"{title}\n\n{message}")
+            jobs.append((self._send_line, (f"{title}\n\n{message}",)))
+        
+        if len(jobs) == 1:
+            fn, args = jobs[0]
+            fn(*args)
+        elif jobs:
+            # 各 _send_* 自行處理錯誤，這裡只需等待送完（最多 SEND_ALL_TIMEOUT 秒）
+            executor = self._get_executor()
+            _, not_done = wait([executor.submit(fn, *args) for fn, args in jobs],
+                               timeout=SEND_ALL_TIMEOUT)
+            if not_done:
+                print(f"⏳ {len(not_done)} 個通道在 {SEND_ALL_TIMEOUT} 秒內未完成，於背景繼續發送")
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """取得發送用的執行緒池（尚未建立或已被 close() 關閉時重新建立）"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='notify')
+            return self._executor
     
     def _send_email(self, subject: str, body: str):
         """發送 Email"""
@@ -144,15 +260,59 @@ class ProjectNotifier:
             html_body = self._markdown_to_html(body)
             msg.attach(MIMEText(html_body, 'html'))
             
-            with smtplib.SMTP(self.config.smtp_server, self.config.smtp_port) as server:
-                server.starttls()
-                server.login(self.config.smtp_user, self.config.smtp_password)
-                server.send_message(msg)
+            with self._smtp_slots:
+                generation = self._smtp_generation
+                server, sent = self._acquire_smtp()
+                try:
+                    try:
+                        server.send_message(msg)
+                    except smtplib.SMTPServerDisconnected:
+                        # 連線在檢查後才被伺服器關閉，重新連線再送一次
+                        self._quit_smtp(server)
+                        server, sent = self._connect_smtp(), 0
+                        server.send_message(msg)
+                except Exception:
+                    self._quit_smtp(server)
+                    raise
+                self._release_smtp(server, sent + 1, generation)
             
             print(f"✅ Email 已發送至 {len(self.config.email_recipients)} 位收件人")
         except Exception as e:
             print(f"❌ Email 發送失敗: {e}")
     
+    def _acquire_smtp(self):
+        """借出一條 SMTP 連線：閒置連線以 NOOP 確認仍可用，沒有可用連線時新建"""
+        while True:
+            try:
+                server, sent = self._smtp_idle.get_nowait()
+            except queue.Empty:
+                return self._connect_smtp(), 0
+            try:
+                if server.noop()[0] == 250:
+                    return server, sent
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._quit_smtp(server)
+    
+    def _release_smtp(self, server: smtplib.SMTP, sent: int, generation: int):
+        """歸還 SMTP 連線；已達寄送上限或在借出後呼叫過 close() 時改為關閉"""
+        with self._smtp_lock:
+            if sent < SMTP_MAX_MESSAGES and generation == self._smtp_generation:
+                self._smtp_idle.put((server, sent))
+                return
+        self._quit_smtp(server)
+    
+    def _connect_smtp(self) -> smtplib.SMTP:
+        """建立 SMTP 連線：STARTTLS 並登入"""
+        server = smtplib.SMTP(self.config.smtp_server, self.config.smtp_port, timeout=SMTP_TIMEOUT)
+        try:
+            server.starttls()
+            server.login(self.config.smtp_user, self.config.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
     def _send_teams(self, title: str, message: str):
         """發送 Microsoft Teams 訊息"""
         try:
@@ -163,21 +323,24 @@ class ProjectNotifier:
                 "summary": title,
                 "sections": [{
                     "activityTitle": title,
-                    "text": message.replace('\n', '<br>'),
+                    "text": self._to_html_br(message),
                     "markdown": True
                 }]
             }
             
-            response = requests.post(
+            response = self._http.post(
                 self.config.teams_webhook_url,
                 json=payload,
-                headers={'Content-Type': 'application/json'}
+                headers={'Content-Type': 'application/json'},
+                timeout=WEBHOOK_TIMEOUT,
             )
             
             if response.status_code == 200:
                 print("✅ Teams 訊息已發送")
             else:
                 print(f"❌ Teams 發送失敗: {response.status_code}")
+        except requests.Timeout:
+            print("❌ Teams 發送逾時")
         except Exception as e:
             print(f"❌ Teams 發送失敗: {e}")
     
@@ -203,16 +366,19 @@ class ProjectNotifier:
                 ]
             }
             
-            response = requests.post(
+            response = self._http.post(
                 self.config.slack_webhook_url,
                 json=payload,
-                headers={'Content-Type': 'application/json'}
+                headers={'Content-Type': 'application/json'},
+                timeout=WEBHOOK_TIMEOUT,
             )
             
             if response.status_code == 200:
                 print("✅ Slack 訊息已發送")
             else:
                 print(f"❌ Slack 發送失敗: {response.status_code}")
+        except requests.Timeout:
+            print("❌ Slack 發送逾時")
         except Exception as e:
             print(f"❌ Slack 發送失敗: {e}")
     
@@ -224,23 +390,32 @@ class ProjectNotifier:
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
             
-            response = requests.post(
+            response = self._http.post(
                 'https://notify-api.line.me/api/notify',
                 headers=headers,
-                data={'message': message}
+                data={'message': message},
+                timeout=WEBHOOK_TIMEOUT,
             )
             
             if response.status_code == 200:
                 print("✅ Line 訊息已發送")
             else:
                 print(f"❌ Line 發送失敗: {response.status_code}")
+        except requests.Timeout:
+            print("❌ Line 發送逾時")
         except Exception as e:
             print(f"❌ Line 發送失敗: {e}")
     
+    @staticmethod
+    def _to_html_br(text: str) -> str:
+        """跳脫 HTML 特殊字元並將換行轉為 <br>（Teams 訊息卡片使用）"""
+        return escape(text, quote=False).replace('\n', '<br>')
+    
     def _markdown_to_html(self, md: str) -> str:
         """簡易 Markdown 轉 HTML"""
-        html = md
-        html = html.replace('**', '<strong>').replace('**', '</strong>')
+        # 成對的 ** 轉為 <strong>…</strong>（逐一取代 ** 會讓所有標記都變成開頭標籤）
+        # 先跳脫任務名稱等內容中的 HTML 特殊字元，再加上標籤
+        html = BOLD_PATTERN.sub(r'<strong>\1</strong>', escape(md, quote=False))
         html = html.replace('\n', '<br>')
         html = html.replace('- ', '• ')
         return f"<html><body style='font-family: Arial, sans-serif;'>{html}</body></html>"
@@ -252,69 +427,69 @@ class ScheduledNotifier:
     def __init__(self, notifier: ProjectNotifier, excel_path: str):
         self.notifier = notifier
         self.excel_path = excel_path
+        # 以檔案修改時間為鍵快取解析結果，同一輪排程內多次呼叫只讀一次 Excel
+        self._cache = None
+        self._cache_mtime = None
     
     def load_data(self) -> pd.DataFrame:
-        """載入資料"""
-        df = pd.read_excel(self.excel_path, sheet_name='軟體時程', header=None)
-        
-        tasks = []
-        for i in range(6, len(df)):
-            row = df.iloc[i]
-            task_name = row[0]
-            
-            if pd.notna(task_name) and str(task_name).strip():
-                task = {
-                    'task': str(task_name).strip(),
-                    'owner': str(row[2]) if pd.notna(row[2]) else '',
-                    'status': str(row[7]) if pd.notna(row[7]) else '',
-                    'plan_end': pd.to_datetime(row[9]) if pd.notna(row[9]) else None,
-                    'variance_days': int(row[14]) if pd.notna(row[14]) else 0,
-                }
-                tasks.append(task)
-        
-        return pd.DataFrame(tasks)
+        """載入資料（檔案未變更時回傳快取的副本）"""
+        mtime = os.stat(self.excel_path).st_mtime_ns
+        if self._cache is None or self._cache_mtime != mtime:
+            self._cache = read_software_tasks(self.excel_path)
+            self._cache_mtime = mtime
+        return self._cache.copy()
     
     def check_and_notify(self):
         """檢查並發送通知"""
+        # 沒有啟用的通道時連 Excel 都不必讀
+        if not self.notifier.config.any_enabled:
+            return
+        
         df = self.load_data()
         today = datetime.now()
         
         # 檢查延遲項目
         delay_tasks = df[df['status'] == 'Delay'].to_dict('records')
         if delay_tasks:
-            self.notifier.send_delay_alert(delay_tasks)
+            self.notifier.send_delay_alert(delay_tasks, now=today)
         
         # 檢查即將到期
-        upcoming = df[
-            (df['status'] == 'Going') & 
-            (df['plan_end'].notna()) &
-            (df['plan_end'] <= today + timedelta(days=3))
-        ]
+        upcoming = self._due_within(df, today, days=3)
         
         if not upcoming.empty:
             self.notifier.send_delay_alert(
                 upcoming.to_dict('records'),
-                project_name='OHTC 專案 - 即將到期提醒'
+                project_name='OHTC 專案 - 即將到期提醒',
+                now=today,
             )
     
     def send_summary(self):
         """發送摘要"""
+        if not self.notifier.config.any_enabled:
+            return
+        
         df = self.load_data()
         today = datetime.now()
         
+        # 各狀態數量以一次 value_counts 取得
+        status_counts = df['status'].value_counts()
         summary = {
             'total': len(df),
-            'done': len(df[df['status'] == 'Done']),
-            'going': len(df[df['status'] == 'Going']),
-            'delay': len(df[df['status'] == 'Delay']),
-            'upcoming': df[
-                (df['status'] == 'Going') & 
-                (df['plan_end'].notna()) &
-                (df['plan_end'] <= today + timedelta(days=7))
-            ].to_dict('records'),
+            'done': int(status_counts.get('Done', 0)),
+            'going': int(status_counts.get('Going', 0)),
+            'delay': int(status_counts.get('Delay', 0)),
+            'upcoming': self._due_within(df, today, days=7).to_dict('records'),
         }
         
-        self.notifier.send_daily_summary(summary)
+        self.notifier.send_daily_summary(summary, now=today)
+    
+    @staticmethod
+    def _due_within(df: pd.DataFrame, today: datetime, days: int) -> pd.DataFrame:
+        """進行中且在指定天數內到期（含已過期）的任務"""
+        return df[
+            (df['status'] == 'Going') &
+            (df['plan_end'] <= today + timedelta(days=days))
+        ]
 
 
 # 使用範例
@@ -0,0 +1,36 @@
+"""
+OHTC 排程表讀取
+===============
+CLI 與排程通知共用的軟體時程讀取函式
+"""
+
+import pandas as pd
+
+# 讀取 Excel 優先使用 calamine（Rust 實作）引擎，未安裝 python-calamine 時退回 openpyxl
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_READ_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_READ_ENGINE = None
+
+
+def read_software_tasks(file_path) -> pd.DataFrame:
+    """讀取軟體時程的任務、負責單位、狀態、計劃完成日與誤差天數"""
+    # 只讀取需要的欄位，任務從第 7 列開始，整欄一次轉換型別
+    df = pd.read_excel(
+        file_path, sheet_name='軟體時程', header=None, skiprows=6,
+        usecols=[0, 2, 7, 9, 14], names=['task', 'owner', 'status', 'plan_end', 'variance_days'],
+        engine=EXCEL_READ_ENGINE,
+    )
+
+    # 略過項目欄空白的列
+    task_names = df['task'].astype(str).str.strip()
+    df = df[df['task'].notna() & (task_names != '')].assign(task=task_names)
+
+    # 負責單位與狀態：空值轉為空字串，其餘轉為文字
+    for col in ('owner', 'status'):
+        df[col] = df[col].map(str, na_action='ignore').fillna('')
+    df['plan_end'] = pd.to_datetime(df['plan_end'], errors='coerce')
+    df['variance_days'] = pd.to_numeric(df['variance_days'], errors='coerce').fillna(0).astype(int)
+
+    return df.reset_index(drop=True)
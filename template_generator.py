@@ -8,7 +8,6 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from openpyxl.formatting.rule import FormulaRule, ColorScaleRule
-from openpyxl.chart import BarChart, Reference
 from datetime import datetime, timedelta
 import argparse
 
@@ -36,6 +35,20 @@ class ScheduleTemplateGenerator:
         self.header_fill = PatternFill(start_color=self.COLORS['header_bg'], 
                                        end_color=self.COLORS['header_bg'], 
                                        fill_type='solid')
+        self.bold_font = Font(bold=True)
+        self.title_font = Font(bold=True, size=16)
+        
+        # 進度狀態條件格式的底色
+        self.done_fill = PatternFill(start_color=self.COLORS['done_bg'], 
+                                     end_color=self.COLORS['done_bg'], 
+                                     fill_type='solid')
+        self.going_fill = PatternFill(start_color=self.COLORS['going_bg'], 
+                                      end_color=self.COLORS['going_bg'], 
+                                      fill_type='solid')
+        self.delay_fill = PatternFill(start_color=self.COLORS['delay_bg'], 
+                                      end_color=self.COLORS['delay_bg'], 
+                                      fill_type='solid')
+        
         self.center_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
         self.left_align = Alignment(horizontal='left', vertical='center', wrap_text=True)
         
@@ -46,6 +59,18 @@ class ScheduleTemplateGenerator:
             bottom=Side(style='thin', color=self.COLORS['border'])
         )
     
+    @staticmethod
+    def _put(ws, row: int, column: int, value, border=None, number_format: str = None, font=None):
+        """寫入儲存格，並在同一次取得儲存格時設定框線、格式與字型"""
+        cell = ws.cell(row=row, column=column, value=value)
+        if border is not None:
+            cell.border = border
+        if number_format is not None:
+            cell.number_format = number_format
+        if font is not None:
+            cell.font = font
+        return cell
+    
     def create_software_schedule(self, project_info: dict, tasks: list = None):
         """建立軟體時程表"""
         ws = self.wb.active
@@ -80,7 +105,7 @@ class ScheduleTemplateGenerator:
         
         # 專案標題
         ws['A1'] = f"{project_info.get('name', 'OHTC專案')}_排程表"
-        ws['A1'].font = Font(bold=True, size=16)
+        ws['A1'].font = self.title_font
         ws.merge_cells('A1:F1')
         
         # 專案資訊區
@@ -92,7 +117,7 @@ class ScheduleTemplateGenerator:
         
         for i, (label, key) in enumerate(info_rows, start=3):
             ws[f'A{i}'] = label
-            ws[f'A{i}'].font = Font(bold=True)
+            ws[f'A{i}'].font = self.bold_font
             ws[f'B{i}'] = '請輸入' + label
             ws[f'C{i}'] = project_info.get(key, '')
         
@@ -137,41 +162,27 @@ class ScheduleTemplateGenerator:
         current_date = start_date
         
         for i, task in enumerate(default_tasks, start=7):
-            ws.cell(row=i, column=1, value=task['task']).border = self.thin_border
-            ws.cell(row=i, column=3, value=task['owner']).border = self.thin_border
+            self._put(ws, i, 1, task['task'], border=self.thin_border)
+            self._put(ws, i, 3, task['owner'], border=self.thin_border)
             
             # 計劃日期
             end_date = current_date + timedelta(days=task['days'])
-            ws.cell(row=i, column=9, value=current_date).border = self.thin_border
-            ws.cell(row=i, column=10, value=end_date).border = self.thin_border
-            ws.cell(row=i, column=11, value=task['days']).border = self.thin_border
+            self._put(ws, i, 9, current_date, border=self.thin_border, number_format='YYYY-MM-DD')
+            self._put(ws, i, 10, end_date, border=self.thin_border, number_format='YYYY-MM-DD')
+            self._put(ws, i, 11, task['days'], border=self.thin_border)
             
             # 進度欄位
-            ws.cell(row=i, column=8, value='').border = self.thin_border
-            
-            # 設定日期格式
-            ws.cell(row=i, column=9).number_format = 'YYYY-MM-DD'
-            ws.cell(row=i, column=10).number_format = 'YYYY-MM-DD'
+            self._put(ws, i, 8, '', border=self.thin_border)
             
             current_date = end_date
         
         # 新增條件格式（進度狀態顏色）
-        done_fill = PatternFill(start_color=self.COLORS['done_bg'], 
-                                end_color=self.COLORS['done_bg'], 
-                                fill_type='solid')
-        going_fill = PatternFill(start_color=self.COLORS['going_bg'], 
-                                 end_color=self.COLORS['going_bg'], 
-                                 fill_type='solid')
-        delay_fill = PatternFill(start_color=self.COLORS['delay_bg'], 
-                                 end_color=self.COLORS['delay_bg'], 
-                                 fill_type='solid')
-        
         ws.conditional_formatting.add('H7:H100',
-            FormulaRule(formula=['$H7="Done"'], fill=done_fill))
+            FormulaRule(formula=['$H7="Done"'], fill=self.done_fill))
         ws.conditional_formatting.add('H7:H100',
-            FormulaRule(formula=['$H7="Going"'], fill=going_fill))
+            FormulaRule(formula=['$H7="Going"'], fill=self.going_fill))
         ws.conditional_formatting.add('H7:H100',
-            FormulaRule(formula=['$H7="Delay"'], fill=delay_fill))
+            FormulaRule(formula=['$H7="Delay"'], fill=self.delay_fill))
         
         # 新增資料驗證（下拉選單）
         from openpyxl.worksheet.datavalidation import DataValidation
@@ -208,8 +219,7 @@ class ScheduleTemplateGenerator:
         
         row = 7
         for area in areas:
-            ws.cell(row=row, column=1, value=area)
-            ws.cell(row=row, column=1).font = Font(bold=True)
+            ws.cell(row=row, column=1, value=area).font = self.bold_font
             ws.cell(row=row, column=3, value=0)
             row += 1
             